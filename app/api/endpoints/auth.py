@@ -1,8 +1,11 @@
 from datetime import timedelta
 from fastapi import Depends, HTTPException, status, APIRouter
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from app.core.security import Hash , create_access_token, get_current_user
+from jose import JWTError
+from app.core.manager_instance import manager
+from app.core.security import create_access_token, decode_token, get_current_user, oauth2_scheme, password_hasher, revoked_tokens, token_id
 from app import database  # assuming your get_db is here
 from app.models import user as user_model
 from app.schemas.auth import TokenData
@@ -13,13 +16,22 @@ router = APIRouter(
 )
 
 @router.post("/login")
-def login(request: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
-    user = db.query(user_model.User).filter(user_model.User.email == request.username).first()
+async def login(request: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
+    user = await run_in_threadpool(
+        lambda: db.query(user_model.User).filter(user_model.User.email == request.username).first()
+    )
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    if not Hash.verify(request.password, user.password):
+
+    # bcrypt runs in the hashing pool, not on the event loop or the request threadpool
+    verified, upgraded_hash = await password_hasher.verify_and_update(request.password, user.password)
+    if not verified:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect password")
-    
+    if upgraded_hash:
+        # Stored hash used a different bcrypt cost: replace it while we have the plain password
+        user.password = upgraded_hash
+        await run_in_threadpool(db.commit)
+
     access_token = create_access_token(data={"sub": str(user.id),"email": user.email, "role": user.role},expires_delta=timedelta(hours=1))
     if not access_token:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not create access token")
@@ -32,3 +44,16 @@ def validate_token(current_user: TokenData = Depends(get_current_user)):
     
     # If the token is valid, return the user information
     return {"status": "valid", "email": current_user.email, "user_id": current_user.user_id}
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(token: str = Depends(oauth2_scheme)):
+    try:
+        payload = decode_token(token)
+    except JWTError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+
+    # Revoked here and on every other worker until the token would have expired anyway
+    revoked = {"token_id": token_id(payload, token), "expires_at": payload["exp"]}
+    revoked_tokens.revoke(**revoked)
+    await manager.publish({"type": "revoke_token", **revoked})
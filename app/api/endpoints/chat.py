@@ -1,12 +1,21 @@
-from typing import List
-from app.schemas.message import MessageOut
-from fastapi.concurrency import run_in_threadpool
-from fastapi import WebSocket, APIRouter, Depends, Query, HTTPException, status
+import base64
+from typing import Dict, List, Optional
+from app.schemas.message import ConversationOut, MessageOut
+from fastapi import WebSocket, APIRouter, Depends, Query, HTTPException, Response, status
+from sqlalchemy import case, func, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.core.manager_instance import manager
-from app.models.message import Message, MessageReaction  # <- Import MessageReaction model here
+from app.database import AsyncSessionLocal, get_async_db, get_async_user_read_db
+from app.core.config import settings
+from app.core.delivery import mark_delivered, messages_since
+from app.core.inbox import unread_recount
+from app.core.manager_instance import manager, message_writer, notify_delivered, presence
+from app.core.read_routing import pin_users
+from app.models.message import ConversationSummary, Message, MessageReaction, ReadWatermark, conversation_key  # <- Import MessageReaction model here
 from datetime import datetime
+from uuid import uuid4
 
 router = APIRouter(
     prefix="/chat",
@@ -14,11 +23,18 @@ router = APIRouter(
 )
 
 @router.websocket("/ws/{user_id}")
-async def websocket_endpoint(websocket: WebSocket, user_id: int, db: Session = Depends(get_db)):
-    await manager.connect(user_id, websocket)
-    await manager.send_broadcast(f"📢 User {user_id} is now online!", sender_id=user_id)
+async def websocket_endpoint(websocket: WebSocket, user_id: int, last_seen_id: Optional[int] = None):
+    # No request-scoped session here: a socket can stay open for hours, so each
+    # operation below checks out its own short-lived async session instead.
+    # Presence is delivered to subscribers as coalesced diffs, not broadcast to everyone
+    connection = await manager.connect(user_id, websocket)
 
     try:
+        # Reconnecting clients pass the newest message id they have and get one
+        # batch of everything newer instead of refetching every conversation
+        if last_seen_id is not None:
+            await send_sync(user_id, last_seen_id)
+
         while True:
             data = await websocket.receive_json()
             msg_type = data.get("type", "chat_message")
@@ -33,62 +49,88 @@ async def websocket_endpoint(websocket: WebSocket, user_id: int, db: Session = D
                     }, receiver_id)
                 continue
 
+            # ✅ Presence subscriptions
+            elif msg_type == "subscribe_presence":
+                try:
+                    snapshot = presence.subscribe(user_id, data.get("user_ids", []))
+                except ValueError as e:
+                    await manager.send_personal_message(f"Error: {e}", user_id)
+                    continue
+                if snapshot is not None:
+                    await manager.send_personal_message(snapshot, user_id)
+                continue
+
+            elif msg_type == "unsubscribe_presence":
+                try:
+                    presence.unsubscribe(user_id, data.get("user_ids", []))
+                except ValueError as e:
+                    await manager.send_personal_message(f"Error: {e}", user_id)
+                continue
+
+            # ✅ Incremental sync; repeat with last_id while has_more is true
+            elif msg_type == "sync":
+                await send_sync(user_id, int(data.get("last_seen_id") or 0))
+                continue
+
             # ✅ 2. Chat message
             elif msg_type == "chat_message":
                 receiver_id = data.get("receiver_id")
                 message = data.get("message")
 
                 if receiver_id is None or message is None:
-                    await websocket.send_text("Error: 'receiver_id' and 'message' must be provided.")
+                    await manager.send_personal_message("Error: 'receiver_id' and 'message' must be provided.", user_id)
                     continue
 
-                # Save message in DB
-                def save_message():
-                    new_message = Message(
-                        sender_id=user_id,
-                        receiver_id=receiver_id,
-                        content=message,
-                        is_delivered=True,
-                        timestamp=datetime.utcnow()
-                    )
-                    db.add(new_message)
-                    db.commit()
-                    db.refresh(new_message)
-                    print(f"Message saved with id: {new_message.id}")
-
-                await run_in_threadpool(save_message)
+                # The id is assigned when the row is written; "ref" ties this frame
+                # to the message_ids frame that reports it
+                ref = str(data.get("ref") or uuid4().hex)
+
+                # Queue message for batched persistence; delivery does not wait for the DB.
+                # Offline receivers get it from the stored queue when they sync.
+                await message_writer.enqueue({
+                    "sender_id": user_id,
+                    "receiver_id": receiver_id,
+                    "conversation_key": conversation_key(user_id, receiver_id),
+                    "content": message,
+                    "is_delivered": manager.is_online(receiver_id),
+                    "timestamp": datetime.utcnow(),
+                    "ref": ref,
+                })
+                # Both inboxes and the conversation change; read them back from the primary
+                pin_users(user_id, receiver_id)
 
                 msg_payload = {
                     "type": "chat_message",
                     "sender_id": user_id,
                     "receiver_id": receiver_id,
-                    "message": message
+                    "message": message,
+                    "ref": ref,
                 }
 
                 await manager.send_personal_message(msg_payload, receiver_id)
-                await websocket.send_json(msg_payload)
+                await manager.send_personal_message(msg_payload, user_id)
+
+                # Conversation partners are watched automatically, up to the subscription cap
+                try:
+                    snapshot = presence.subscribe(user_id, [receiver_id])
+                except ValueError:
+                    snapshot = None
+                if snapshot is not None:
+                    await manager.send_personal_message(snapshot, user_id)
 
             # ✅ 3. Mark messages as seen
             elif msg_type == "mark_seen":
                 sender_id = int(data.get("sender_id"))
 
-                def mark_seen():
-                    unseen_messages = db.query(Message).filter(
-                        Message.sender_id == sender_id,
-                        Message.receiver_id == user_id,
-                        Message.is_seen == False
-                    ).all()
-
-                    for message in unseen_messages:
-                        message.is_seen = True
-                    db.commit()
-
-                await run_in_threadpool(mark_seen)
+                async with AsyncSessionLocal() as db:
+                    last_seen_id = await mark_messages_seen_async(db, sender_id=sender_id, receiver_id=user_id)
+                pin_users(user_id)
 
                 # Notify sender their messages were seen
                 await manager.send_personal_message({
                     "type": "seen_ack",
-                    "receiver_id": user_id
+                    "receiver_id": user_id,
+                    "last_seen_message_id": last_seen_id
                 }, sender_id)
 
             # ✅ 4. Add reaction
@@ -96,40 +138,42 @@ async def websocket_endpoint(websocket: WebSocket, user_id: int, db: Session = D
                 message_id = data.get("message_id")
                 emoji = data.get("emoji")
                 if not message_id or not emoji:
-                    await websocket.send_text("Error: 'message_id' and 'emoji' required for adding reaction.")
+                    await manager.send_personal_message("Error: 'message_id' and 'emoji' required for adding reaction.", user_id)
                     continue
 
-                def add_reaction():
-                    # Check if message exists
-                    message_obj = db.query(Message).filter(Message.id == message_id).first()
-                    if not message_obj:
-                        raise HTTPException(status_code=404, detail="Message not found")
-
-                    # Check if reaction exists for this user & message
-                    existing_reaction = db.query(MessageReaction).filter_by(
-                        message_id=message_id,
-                        user_id=user_id,
-                        emoji=emoji
-                    ).first()
-                    if existing_reaction:
-                        return None  # Already reacted
-
-                    reaction = MessageReaction(
-                        message_id=message_id,
-                        user_id=user_id,
-                        emoji=emoji
-                    )
-                    db.add(reaction)
-                    db.commit()
-                    db.refresh(reaction)
-                    return reaction
-
-                reaction_obj = await run_in_threadpool(add_reaction)
-                if reaction_obj is None:
+                async def add_reaction():
+                    async with AsyncSessionLocal() as db:
+                        # Check if message exists
+                        message_obj = (await db.execute(
+                            select(Message.sender_id, Message.receiver_id).where(Message.id == message_id)
+                        )).first()
+                        if not message_obj:
+                            raise HTTPException(status_code=404, detail="Message not found")
+
+                        # Check if reaction exists for this user & message
+                        existing_reaction = (await db.execute(
+                            select(MessageReaction.id).filter_by(
+                                message_id=message_id,
+                                user_id=user_id,
+                                emoji=emoji
+                            )
+                        )).first()
+                        if existing_reaction:
+                            return None  # Already reacted
+
+                        db.add(MessageReaction(
+                            message_id=message_id,
+                            user_id=user_id,
+                            emoji=emoji
+                        ))
+                        await db.commit()
+                        return message_obj
+
+                msg_obj = await add_reaction()
+                if msg_obj is None:
                     continue  # Already reacted, no need to notify
 
                 # Broadcast reaction update to sender & receiver
-                msg_obj = db.query(Message).filter(Message.id == message_id).first()
                 reaction_payload = {
                     "type": "reaction_update",
                     "message_id": message_id,
@@ -146,27 +190,32 @@ async def websocket_endpoint(websocket: WebSocket, user_id: int, db: Session = D
                 message_id = data.get("message_id")
                 emoji = data.get("emoji")
                 if not message_id or not emoji:
-                    await websocket.send_text("Error: 'message_id' and 'emoji' required for removing reaction.")
+                    await manager.send_personal_message("Error: 'message_id' and 'emoji' required for removing reaction.", user_id)
                     continue
 
-                def remove_reaction():
-                    reaction = db.query(MessageReaction).filter_by(
-                        message_id=message_id,
-                        user_id=user_id,
-                        emoji=emoji
-                    ).first()
-                    if reaction:
-                        db.delete(reaction)
-                        db.commit()
-                        return True
-                    return False
-
-                removed = await run_in_threadpool(remove_reaction)
-                if not removed:
+                async def remove_reaction():
+                    async with AsyncSessionLocal() as db:
+                        reaction = (await db.execute(
+                            select(MessageReaction).filter_by(
+                                message_id=message_id,
+                                user_id=user_id,
+                                emoji=emoji
+                            )
+                        )).scalars().first()
+                        if not reaction:
+                            return None
+                        msg_obj = (await db.execute(
+                            select(Message.sender_id, Message.receiver_id).where(Message.id == message_id)
+                        )).first()
+                        await db.delete(reaction)
+                        await db.commit()
+                        return msg_obj
+
+                msg_obj = await remove_reaction()
+                if msg_obj is None:
                     continue  # No reaction found, nothing to do
 
                 # Broadcast reaction removal
-                msg_obj = db.query(Message).filter(Message.id == message_id).first()
                 reaction_payload = {
                     "type": "reaction_update",
                     "message_id": message_id,
@@ -179,35 +228,62 @@ async def websocket_endpoint(websocket: WebSocket, user_id: int, db: Session = D
 
     except Exception as e:
         print(f"Disconnecting user {user_id}. Error: {e}")
-        manager.disconnect(user_id)
-        await manager.send_broadcast(f"📢 User {user_id} has disconnected.", sender_id=user_id)
+        manager.remove(connection)
+        # A reconnect may already have replaced this socket; keep its subscriptions
+        if user_id not in manager.active_connections:
+            presence.unsubscribe_all(user_id)
 
 
 @router.get("/history/", response_model=List[MessageOut])
-def get_message_history(
+async def get_message_history(
     user_id: int,
     other_user_id: int,
-    limit: int = Query(20),
-    offset: int = Query(0),
-    db: Session = Depends(get_db)
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    before_id: Optional[int] = Query(None),
+    after_id: Optional[int] = Query(None),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db),
+    read_db: AsyncSession = Depends(get_async_user_read_db)
 ):
     # Mark other_user's messages as seen
-    mark_messages_seen(db, sender_id=other_user_id, receiver_id=user_id)
-
-    messages = db.query(Message).filter(
-        ((Message.sender_id == user_id) & (Message.receiver_id == other_user_id)) |
-        ((Message.sender_id == other_user_id) & (Message.receiver_id == user_id))
-    ).order_by(Message.timestamp.desc()).offset(offset).limit(limit).all()
+    await mark_messages_seen_async(db, sender_id=other_user_id, receiver_id=user_id)
+
+    if cursor is not None:
+        direction, cursor_id = _decode_cursor(cursor)
+        if direction == "before":
+            before_id = cursor_id
+        else:
+            after_id = cursor_id
+
+    key = conversation_key(user_id, other_user_id)
+    query = select(Message).where(Message.conversation_key == key)
+
+    if after_id is not None:
+        # ✅ Keyset mode: messages newer than after_id, oldest first
+        result = await read_db.execute(query.where(Message.id > after_id).order_by(Message.id.asc()).limit(limit))
+        messages = list(reversed(result.scalars().all()))
+        if messages:
+            response.headers["X-Next-Cursor"] = _encode_cursor("after", messages[0].id)
+    elif before_id is not None:
+        # ✅ Keyset mode: messages older than before_id, newest first
+        result = await read_db.execute(query.where(Message.id < before_id).order_by(Message.id.desc()).limit(limit))
+        messages = result.scalars().all()
+        if len(messages) == limit:
+            response.headers["X-Next-Cursor"] = _encode_cursor("before", messages[-1].id)
+    else:
+        result = await read_db.execute(query.order_by(Message.timestamp.desc()).offset(offset).limit(limit))
+        messages = result.scalars().all()
+
+    # ✅ Aggregate reactions per emoji for the whole page in one grouped query
+    reaction_counts = await get_reaction_counts(read_db, [msg.id for msg in messages])
+
+    # ✅ is_seen is derived from each receiver's read watermark (primary: we just advanced ours)
+    watermarks = await get_read_watermarks(db, key)
 
     enriched_messages = []
     for msg in messages:
-        # ✅ Aggregate reactions per emoji
-        reactions = db.query(MessageReaction.emoji).filter_by(message_id=msg.id).all()
-        reaction_counts = {}
-        for emoji_row in reactions:
-            emoji = emoji_row[0]
-            reaction_counts[emoji] = reaction_counts.get(emoji, 0) + 1
-
         enriched_messages.append({
             "id": msg.id,
             "sender_id": msg.sender_id,
@@ -215,21 +291,167 @@ def get_message_history(
             "content": msg.content,
             "timestamp": msg.timestamp,
             "is_delivered": msg.is_delivered,
-            "is_seen": msg.is_seen,
-            "reactions": reaction_counts  # ✅ Inject actual emoji reactions
+            "is_seen": msg.id <= watermarks.get(msg.receiver_id, 0),
+            "reactions": reaction_counts.get(msg.id, {})  # ✅ Inject actual emoji reactions
         })
 
     return list(reversed(enriched_messages))
 
 
-def mark_messages_seen(db: Session, sender_id: int, receiver_id: int):
-    unseen_messages = db.query(Message).filter(
-        Message.sender_id == sender_id,
-        Message.receiver_id == receiver_id,
-        Message.is_seen == False
-    ).all()
+@router.get("/inbox", response_model=List[ConversationOut])
+async def get_inbox(
+    user_id: int,
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_user_read_db)
+):
+    """A user's conversations, most recent first, with last message and unread count.
+
+    One range scan on (user_id, last_message_id) however long the histories are.
+    Pass X-Next-Cursor back as `cursor` for the next page.
+    """
+    query = select(ConversationSummary).where(ConversationSummary.user_id == user_id)
+    if cursor is not None:
+        direction, before_id = _decode_cursor(cursor)
+        # The inbox only pages backwards; an "after" cursor from /history/ is not valid here
+        if direction != "before":
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(ConversationSummary.last_message_id < before_id)
+
+    result = await db.execute(query.order_by(ConversationSummary.last_message_id.desc()).limit(limit))
+    conversations = result.scalars().all()
+    if len(conversations) == limit:
+        response.headers["X-Next-Cursor"] = _encode_cursor("before", conversations[-1].last_message_id)
+    return conversations
+
+
+async def send_sync(user_id: int, last_seen_id: int):
+    """Send one batch of messages received after last_seen_id and mark them delivered."""
+    batch_size = settings.CHAT_SYNC_BATCH_SIZE
+    async with AsyncSessionLocal() as db:
+        rows = await messages_since(db, user_id, last_seen_id, batch_size + 1)
+        has_more = len(rows) > batch_size
+        rows = rows[:batch_size]
+        last_id = rows[-1].id if rows else last_seen_id
+        delivered = {}
+        if rows:
+            delivered = await mark_delivered(db, user_id, Message.id > last_seen_id, Message.id <= last_id)
+
+    await manager.send_personal_message({
+        "type": "sync",
+        "messages": [
+            {"id": row.id, "sender_id": row.sender_id, "message": row.content, "timestamp": row.timestamp.isoformat()}
+            for row in rows
+        ],
+        "last_id": last_id,
+        "has_more": has_more,
+    }, user_id)
+    await notify_delivered(user_id, delivered)
+
+
+def _encode_cursor(direction: str, message_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{direction}:{message_id}".encode()).decode()
+
+
+def _decode_cursor(cursor: str):
+    try:
+        direction, message_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        if direction not in ("before", "after"):
+            raise ValueError(direction)
+        return direction, int(message_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def get_reaction_counts(db: AsyncSession, message_ids: List[int]) -> Dict[int, Dict[str, int]]:
+    """Return {message_id: {emoji: count}} for the given messages using a single query."""
+    if not message_ids:
+        return {}
+
+    result = await db.execute(
+        select(
+            MessageReaction.message_id,
+            MessageReaction.emoji,
+            func.count(MessageReaction.id)
+        ).where(
+            MessageReaction.message_id.in_(message_ids)
+        ).group_by(MessageReaction.message_id, MessageReaction.emoji)
+    )
+
+    reaction_counts: Dict[int, Dict[str, int]] = {}
+    for message_id, emoji, count in result.all():
+        reaction_counts.setdefault(message_id, {})[emoji] = count
+    return reaction_counts
+
+
+async def get_read_watermarks(db: AsyncSession, key: str) -> Dict[int, int]:
+    """Return {reader_id: last_seen_message_id} for both participants of a conversation."""
+    result = await db.execute(
+        select(ReadWatermark.reader_id, ReadWatermark.last_seen_message_id).where(
+            ReadWatermark.conversation_key == key
+        )
+    )
+    return {reader_id: last_seen for reader_id, last_seen in result.all()}
+
+
+def _latest_message_id(key: str):
+    return select(func.max(Message.id)).where(Message.conversation_key == key)
+
+
+def _watermark_upsert(dialect_name: str, reader_id: int, key: str, up_to_id: int):
+    if dialect_name == "postgresql":
+        insert_stmt = postgresql_insert(ReadWatermark)
+    else:
+        insert_stmt = sqlite_insert(ReadWatermark)
+
+    insert_stmt = insert_stmt.values(
+        reader_id=reader_id,
+        conversation_key=key,
+        last_seen_message_id=up_to_id,
+        updated_at=datetime.utcnow()
+    )
+    return insert_stmt.on_conflict_do_update(
+        index_elements=["reader_id", "conversation_key"],
+        set_={
+            "last_seen_message_id": case(
+                (insert_stmt.excluded.last_seen_message_id > ReadWatermark.last_seen_message_id,
+                 insert_stmt.excluded.last_seen_message_id),
+                else_=ReadWatermark.last_seen_message_id
+            ),
+            "updated_at": insert_stmt.excluded.updated_at,
+        }
+    )
+
+
+def mark_messages_seen(db: Session, sender_id: int, receiver_id: int, up_to_id: Optional[int] = None):
+    """Advance receiver's read watermark for the conversation with sender.
+
+    Runs as a single upsert; the watermark never moves backwards. When
+    up_to_id is not given the newest message in the conversation is used.
+    Returns the message id the watermark was advanced to, if any.
+    """
+    key = conversation_key(sender_id, receiver_id)
+    if up_to_id is None:
+        up_to_id = db.execute(_latest_message_id(key)).scalar()
+        if up_to_id is None:
+            return None
+
+    db.execute(_watermark_upsert(db.get_bind().dialect.name, receiver_id, key, up_to_id))
+    db.execute(unread_recount(receiver_id, key))
+    db.commit()
+    return up_to_id
 
-    for message in unseen_messages:
-        message.is_seen = True
 
-    db.commit()
+async def mark_messages_seen_async(db: AsyncSession, sender_id: int, receiver_id: int, up_to_id: Optional[int] = None):
+    """Async counterpart of mark_messages_seen."""
+    key = conversation_key(sender_id, receiver_id)
+    if up_to_id is None:
+        up_to_id = (await db.execute(_latest_message_id(key))).scalar()
+        if up_to_id is None:
+            return None
+
+    await db.execute(_watermark_upsert(db.get_bind().dialect.name, receiver_id, key, up_to_id))
+    await db.execute(unread_recount(receiver_id, key))
+    await db.commit()
+    return up_to_id
@@ -0,0 +1,23 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.core.recommender import recommender
+from app.core.startup import readiness
+
+router = APIRouter(
+    tags=["Health"]
+)
+
+
+@router.get("/health")
+async def health():
+    """Liveness: the worker is up and serving, warm or not."""
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+async def ready():
+    """Readiness: 200 once pools and caches are warm, 503 while warming up or shutting down."""
+    body = readiness.report()
+    # Informational: /tracks/{id}/similar answers 503 until the first build finishes
+    body["recommender_index"] = recommender.index is not None
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
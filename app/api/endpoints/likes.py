@@ -1,6 +1,14 @@
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, Depends
+from typing import Iterable, List
+from anyio import from_thread
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
+from app.core.leaderboard import top_tracks
+from app.core.manager_instance import manager
+from app.core.recommender import recommender
 from app.core.security import get_current_user
 from app.database import get_db
 from app.models import user as user_model, track as track_model, like as like_model
@@ -13,6 +21,18 @@ router = APIRouter(
 )
 
 
+def _record_like_events(user_id: int, liked: Iterable[int] = (), unliked: Iterable[int] = ()):
+    """Feed committed likes/unlikes to this worker's recommender and, via pub/sub, every other worker's."""
+    liked, unliked = list(liked), list(unliked)
+    for track_id in liked:
+        recommender.record_like(user_id, track_id)
+    for track_id in unliked:
+        recommender.record_unlike(user_id, track_id)
+    if liked or unliked:
+        # These endpoints run in the threadpool; publishing happens on the event loop
+        from_thread.run(manager.publish, {"type": "like_events", "user_id": user_id, "liked": liked, "unliked": unliked})
+
+
 @router.post("/create_like", response_model=like_schema.LikeOut)
 def like_track(request: like_schema.LikeCreate, db: Session = Depends(get_db),current_user: user_schema.UserBase = Depends(get_current_user)):
     # Check if user exists
@@ -40,8 +60,14 @@ def like_track(request: like_schema.LikeCreate, db: Session = Depends(get_db),cu
         liked_at=datetime.utcnow()
     )
     db.add(new_like)
+    # Counter moves in the same transaction as the like row
+    db.query(track_model.Track).filter(track_model.Track.id == request.track_id).update(
+        {track_model.Track.like_count: track_model.Track.like_count + 1}, synchronize_session=False
+    )
     db.commit()
     db.refresh(new_like)
+    top_tracks.increment(request.track_id)
+    _record_like_events(request.user_id, liked=[request.track_id])
 
     return new_like
 
@@ -68,6 +94,88 @@ def unlike_track(request: like_schema.LikeCreate, db: Session = Depends(get_db),
 
     # Delete the like entry
     db.delete(like_entry)
+    db.query(track_model.Track).filter(track_model.Track.id == request.track_id).update(
+        {track_model.Track.like_count: track_model.Track.like_count - 1}, synchronize_session=False
+    )
+    db.commit()
+    top_tracks.decrement(request.track_id)
+    _record_like_events(request.user_id, unliked=[request.track_id])
+
+    return like_entry
+
+
+def _check_batch(db: Session, user_id: int, track_ids: List[int]) -> List[int]:
+    if db.get(user_model.User, user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    track_ids = list(dict.fromkeys(track_ids))
+    found = set(db.scalars(select(track_model.Track.id).where(track_model.Track.id.in_(track_ids))))
+    missing = [track_id for track_id in track_ids if track_id not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Tracks not found: {missing}")
+    return track_ids
+
+
+def _bump_like_counts(db: Session, track_ids: List[int], delta: int):
+    # Every track in the batch changes by exactly one, so a single UPDATE covers them
+    if track_ids:
+        db.execute(
+            update(track_model.Track)
+            .where(track_model.Track.id.in_(track_ids))
+            .values(like_count=track_model.Track.like_count + delta)
+        )
+
+
+@router.post("/batch_like", response_model=like_schema.LikeBatchOut)
+def like_tracks(request: like_schema.LikeBatch, db: Session = Depends(get_db), current_user: user_schema.UserBase = Depends(get_current_user)):
+    track_ids = _check_batch(db, request.user_id, request.track_ids)
+
+    insert_stmt = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    liked_at = datetime.utcnow()
+    stmt = insert_stmt(like_model.Like).values([
+        {"user_id": request.user_id, "track_id": track_id, "liked_at": liked_at} for track_id in track_ids
+    ]).on_conflict_do_nothing(index_elements=["user_id", "track_id"]).returning(like_model.Like.track_id)
+
+    # Only rows that were actually inserted come back, so existing likes are not counted twice
+    liked = list(db.scalars(stmt))
+    _bump_like_counts(db, liked, 1)
     db.commit()
+    for track_id in liked:
+        top_tracks.increment(track_id)
+    _record_like_events(request.user_id, liked=liked)
+
+    return {"user_id": request.user_id, "track_ids": liked}
+
+
+@router.post("/batch_unlike", response_model=like_schema.LikeBatchOut)
+def unlike_tracks(request: like_schema.LikeBatch, db: Session = Depends(get_db), current_user: user_schema.UserBase = Depends(get_current_user)):
+    track_ids = _check_batch(db, request.user_id, request.track_ids)
+
+    unliked = list(db.scalars(
+        delete(like_model.Like)
+        .where(like_model.Like.user_id == request.user_id, like_model.Like.track_id.in_(track_ids))
+        .returning(like_model.Like.track_id)
+    ))
+    _bump_like_counts(db, unliked, -1)
+    db.commit()
+    for track_id in unliked:
+        top_tracks.decrement(track_id)
+    _record_like_events(request.user_id, unliked=unliked)
+
+    return {"user_id": request.user_id, "track_ids": unliked}
+
 
-    return like_entry
\ No newline at end of file
+@router.get("/status", response_model=like_schema.LikeStatusOut)
+def liked_status(
+    user_id: int,
+    track_ids: List[int] = Query(..., max_length=500),
+    db: Session = Depends(get_db),
+    current_user: user_schema.UserBase = Depends(get_current_user)
+):
+    # One IN lookup on the (user_id, track_id) unique index
+    liked = set(db.scalars(
+        select(like_model.Like.track_id).where(
+            like_model.Like.user_id == user_id,
+            like_model.Like.track_id.in_(track_ids)
+        )
+    ))
+    return {"user_id": user_id, "liked": {track_id: track_id in liked for track_id in track_ids}}
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.message import Message
+from app.api.endpoints.chat import mark_messages_seen
 
 router = APIRouter(
     prefix="/messages",  # URL prefix for all routes in this router
@@ -10,9 +11,9 @@ router = APIRouter(
 
 @router.put("/mark-seen/{message_id}")
 def mark_message_seen(message_id: int, db: Session = Depends(get_db)):
-    message = db.query(Message).filter(Message.id == message_id).first()
+    message = db.query(Message.sender_id, Message.receiver_id).filter(Message.id == message_id).first()
     if message:
-        message.is_seen = True
-        db.commit()
+        # Advances the receiver's read watermark up to this message
+        mark_messages_seen(db, sender_id=message.sender_id, receiver_id=message.receiver_id, up_to_id=message_id)
         return {"message": "Message marked as seen"}
     return {"error": "Message not found"}
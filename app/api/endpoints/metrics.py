@@ -0,0 +1,56 @@
+from typing import List
+import anyio
+from fastapi import APIRouter, Response
+from app.core import metrics
+from app.core.catalog_cache import catalog_cache
+from app.core.manager_instance import manager, message_writer
+from app.core.security import password_hasher, token_cache
+
+router = APIRouter(
+    tags=["Metrics"]
+)
+
+WEBSOCKET_GAUGES = {
+    "connections": "Open WebSocket connections on this worker.",
+    "remote_users": "Users connected to other workers.",
+    "queued_frames": "Frames waiting in per-connection send queues.",
+    "max_queue_depth": "Deepest per-connection send queue.",
+}
+
+# manager.stats() entries that only ever grow
+WEBSOCKET_COUNTERS = {
+    "dropped_frames": "Frames dropped for slow consumers.",
+    "slow_consumer_disconnects": "Connections closed for falling behind.",
+}
+
+
+def runtime_gauges() -> List[str]:
+    # Sampled at scrape time from the components that already keep these numbers
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    lines = metrics.render_gauges("threadpool_threads_in_use", "Worker threads running sync endpoints/dependencies.", {(): limiter.borrowed_tokens})
+    lines += metrics.render_gauges("threadpool_threads_max", "Size of the request threadpool.", {(): limiter.total_tokens})
+    lines += metrics.render_gauges("threadpool_waiting", "Calls waiting for a free worker thread.", {(): limiter.statistics().tasks_waiting})
+
+    for key, value in manager.stats().items():
+        if key in WEBSOCKET_COUNTERS:
+            lines += metrics.render_counters(f"websocket_{key}", WEBSOCKET_COUNTERS[key], {(): value})
+        else:
+            lines += metrics.render_gauges(f"websocket_{key}", WEBSOCKET_GAUGES.get(key, key), {(): value})
+
+    lines += metrics.render_gauges("chat_write_queue_depth", "Chat messages waiting to be persisted.", {(): message_writer.queued})
+    lines += metrics.render_counters(
+        "catalog_cache_lookups", "Catalog page cache lookups.",
+        {("hit",): catalog_cache.hits, ("miss",): catalog_cache.misses}, ("result",)
+    )
+    lines += metrics.render_counters(
+        "token_cache_lookups", "Verified-token cache lookups.",
+        {("hit",): token_cache.hits, ("miss",): token_cache.misses}, ("result",)
+    )
+    lines += metrics.render_gauges("password_hash_pending", "Password hashes queued or running.", {(): password_hasher.pending})
+    lines += metrics.render_counters("password_hash_rejected", "Password hashes rejected with 503.", {(): password_hasher.rejected})
+    return lines
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return Response(metrics.render(runtime_gauges), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,11 +1,22 @@
-from typing import List
+from typing import List, Optional
+import hashlib
+import json
 import os
-import shutil
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_async_db, get_async_read_db, get_db
 from app.models import track as track_model
 from app.schemas import track as track_schema , user as user_schema
+from app.core import search
+from app.core.audio_jobs import audio_jobs
+from app.core.catalog_cache import catalog_cache
+from app.core.leaderboard import top_tracks
+from app.core.recommender import recommender
+from app.core.config import settings
+from app.core.uploads import store_upload
 from app.core.security import get_current_admin_user, get_current_user
 
 
@@ -17,78 +28,240 @@ router = APIRouter(
 UPLOAD_FOLDER = "app/static/music_files"
 # Ensure the upload folder exists
 
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".ogg")
+
+
 @router.post("/", response_model=track_schema.TrackBase, dependencies=[Depends(get_current_admin_user)])
-def create_track(
+async def create_track(
     title: str,
     artist: str,
     album: str | None = None,
-    duration: str | None = None,
+    duration: int | None = None,
     music_file: UploadFile = File(None),
     db: Session = Depends(get_db),
     current_user: user_schema.UserBase = Depends(get_current_user)
 ):
-    existing_track = db.query(track_model.Track).filter(track_model.Track.title == title).first()
+    existing_track = await run_in_threadpool(
+        lambda: db.query(track_model.Track.id).filter(track_model.Track.title == title).first()
+    )
     if existing_track:
         raise HTTPException(status_code=400, detail="Track already exists")
 
     file_url = None
     if music_file:
-        if not music_file.filename.endswith((".mp3", ".wav", ".ogg")):
+        if not music_file.filename or not music_file.filename.lower().endswith(AUDIO_EXTENSIONS):
             raise HTTPException(status_code=400, detail="Invalid file type")
-        
-        if not os.path.exists(UPLOAD_FOLDER):
-            os.makedirs(UPLOAD_FOLDER)
-
-        file_location = os.path.join(UPLOAD_FOLDER, music_file.filename)
-        with open(file_location, "wb") as buffer:
-            shutil.copyfileobj(music_file.file, buffer)
-        
-        file_url = f"/music_files/{music_file.filename}"
-
-    new_track = track_model.Track(
-        title=title,
-        artist=artist,
-        album=album,
-        duration=duration,
-        file_url=file_url
-    )
-    db.add(new_track)
-    db.commit()
-    db.refresh(new_track)
+
+        # Streamed, hashed and stored under its content hash (identical uploads are deduplicated)
+        file_name = await store_upload(music_file, UPLOAD_FOLDER, settings.MAX_UPLOAD_BYTES)
+        file_url = f"/music_files/{file_name}"
+
+    def save_track():
+        new_track = track_model.Track(
+            title=title,
+            artist=artist,
+            album=album,
+            duration=duration,
+            file_url=file_url
+        )
+        db.add(new_track)
+        bump_catalog_version(db)
+        db.commit()
+        catalog_cache.clear()
+        db.refresh(new_track)
+        return new_track
+
+    new_track = await run_in_threadpool(save_track)
+    if file_url:
+        # Real duration, bitrate and waveform are filled in off the request path
+        audio_jobs.submit(new_track.id, file_url)
     return new_track
 
+# Fields clients may request through ?fields=; the default matches TrackBase
+CATALOG_FIELDS = ("id", "title", "artist", "album", "duration", "bitrate", "sample_rate", "file_url")
+DEFAULT_CATALOG_FIELDS = ("title", "artist", "album", "duration", "file_url")
+
+
 @router.get("/all", response_model=List[track_schema.TrackBase])
-def get_all_tracks(
-    db: Session = Depends(get_db)
+async def get_all_tracks(
+    request: Request,
+    cursor: Optional[int] = Query(None, description="Return tracks with an id greater than this"),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of track fields"),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    tracks = db.query(track_model.Track).all()
-    return tracks
+    selected = DEFAULT_CATALOG_FIELDS
+    if fields:
+        selected = tuple(f.strip() for f in fields.split(",") if f.strip())
+        unknown = set(selected) - set(CATALOG_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    # Cheap primary-key lookup; the catalog is only re-read when this changes
+    version = (await db.execute(
+        select(track_model.CatalogVersion.version).where(track_model.CatalogVersion.id == 1)
+    )).scalar() or 0
+
+    page_key = (cursor, limit, selected)
+    etag = '"catalog-%d-%s"' % (version, hashlib.sha1(repr(page_key).encode()).hexdigest()[:12])
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    cached = catalog_cache.get(version, page_key)
+    if cached is not None:
+        body, next_cursor = cached
+    else:
+        # Always fetch id so the next cursor can be computed
+        columns = [getattr(track_model.Track, f) for f in dict.fromkeys(("id",) + selected)]
+        query = select(*columns).order_by(track_model.Track.id)
+        if cursor is not None:
+            query = query.where(track_model.Track.id > cursor)
+        if limit is not None:
+            query = query.limit(limit)
+        rows = (await db.execute(query)).mappings().all()
+
+        next_cursor = rows[-1]["id"] if limit is not None and len(rows) == limit else None
+        body = json.dumps([{f: row[f] for f in selected} for row in rows]).encode()
+        catalog_cache.put(version, page_key, (body, next_cursor))
+
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = str(next_cursor)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def bump_catalog_version(db: Session):
+    """Advance the catalog version inside the caller's transaction."""
+    updated = db.query(track_model.CatalogVersion).filter(track_model.CatalogVersion.id == 1).update(
+        {track_model.CatalogVersion.version: track_model.CatalogVersion.version + 1}
+    )
+    if not updated:
+        db.add(track_model.CatalogVersion(id=1, version=1))
+
+
+@router.get("/search", response_model=List[track_schema.TrackSearchResult])
+async def search_tracks(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    # Ranked prefix search over title, artist and album (type-ahead friendly)
+    return await search.search_tracks(db, q, limit)
+
+
+@router.get("/top", response_model=List[track_schema.TrackRanked])
+async def get_top_tracks(
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Picks up likes recorded by other workers; between reloads updates are incremental
+    if top_tracks.is_stale(settings.TOP_TRACKS_RESYNC_INTERVAL):
+        counts = (await db.execute(
+            select(track_model.Track.id, track_model.Track.like_count).where(track_model.Track.like_count > 0)
+        )).all()
+        top_tracks.load(counts)
+
+    ranked = top_tracks.top(limit)
+    by_id = await tracks_by_id(db, [track_id for track_id, _ in ranked])
+    return [
+        track_schema.TrackRanked.model_validate(by_id[track_id]).model_copy(update={"like_count": count})
+        for track_id, count in ranked if track_id in by_id
+    ]
+
+
+async def tracks_by_id(db: AsyncSession, ids) -> dict:
+    """Load tracks for a ranked id list with one IN query."""
+    ids = [int(track_id) for track_id in ids]
+    if not ids:
+        return {}
+    tracks = (await db.execute(
+        select(track_model.Track).where(track_model.Track.id.in_(ids))
+    )).scalars().all()
+    return {track.id: track for track in tracks}
+
+
+def ranked_tracks(by_id: dict, ids, scores) -> List[track_schema.TrackRecommendation]:
+    return [
+        track_schema.TrackRecommendation(
+            **track_schema.TrackSearchResult.model_validate(by_id[int(track_id)]).model_dump(), score=float(score)
+        )
+        for track_id, score in zip(ids, scores) if int(track_id) in by_id
+    ]
+
+
+@router.post("/analyze", status_code=202, dependencies=[Depends(get_current_admin_user)])
+async def analyze_tracks():
+    # Backfill: queue analysis for every uploaded track that has not been analyzed yet
+    queued = await audio_jobs.backfill()
+    return {"queued": queued}
 
 
 @router.get("/{id}", response_model=track_schema.TrackBase, status_code=200)
-def get_track(id: int, db: Session = Depends(get_db)):
-    track = db.query(track_model.Track).filter(track_model.Track.id == id).first()
+async def get_track(id: int, db: AsyncSession = Depends(get_async_read_db)):
+    track = await db.get(track_model.Track, id)
     if not track:
         raise HTTPException(status_code=404, detail=f'Track with id {id} not found')
     return track
 
-@router.put("/{id}", response_model=track_schema.TrackBase, status_code=200)
-def update_track(id: int, request: track_schema.TrackBase, db: Session = Depends(get_db), current_user: user_schema.UserBase = Depends(get_current_user)):
-    track = db.query(track_model.Track).filter(track_model.Track.id == id).first()
-    if not track:
+
+@router.get("/{id}/waveform", status_code=200)
+async def get_track_waveform(id: int, request: Request, db: AsyncSession = Depends(get_async_read_db)):
+    """Waveform peaks as raw bytes: one unsigned byte (0-255) per point."""
+    row = (await db.execute(
+        select(track_model.Track.id, track_model.Track.waveform).where(track_model.Track.id == id)
+    )).first()
+    if row is None:
         raise HTTPException(status_code=404, detail=f'Track with id {id} not found')
-    
-    # Update the track's details
-    track.title = request.title
-    track.artist = request.artist
-    track.album = request.album
-    track.duration = request.duration
-    if request.file_url:
-        # If a new file URL is provided, update it
-        track.file_url = request.file_url
-    
-    db.commit()
-    db.refresh(track)
+    if row.waveform is None:
+        raise HTTPException(status_code=404, detail="Waveform not available yet")
+
+    etag = '"%s"' % hashlib.sha1(row.waveform).hexdigest()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=row.waveform, media_type="application/octet-stream", headers=headers)
+
+@router.get("/{id}/similar", response_model=List[track_schema.TrackRecommendation])
+async def get_similar_tracks(
+    id: int,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    # "Listeners also liked": precomputed item-item neighbours, served from memory
+    if recommender.index is None:
+        raise HTTPException(status_code=503, detail="Recommendations are not ready yet")
+    ids, scores = recommender.similar(id, limit)
+    return ranked_tracks(await tracks_by_id(db, ids), ids, scores)
+
+@router.put("/{id}", response_model=track_schema.TrackBase, status_code=200)
+async def update_track(id: int, request: track_schema.TrackBase, db: Session = Depends(get_db), current_user: user_schema.UserBase = Depends(get_current_user)):
+    def save_track():
+        track = db.query(track_model.Track).filter(track_model.Track.id == id).first()
+        if not track:
+            raise HTTPException(status_code=404, detail=f'Track with id {id} not found')
+
+        # Update the track's details
+        track.title = request.title
+        track.artist = request.artist
+        track.album = request.album
+        track.duration = request.duration
+        file_changed = bool(request.file_url) and request.file_url != track.file_url
+        if request.file_url:
+            # If a new file URL is provided, update it
+            track.file_url = request.file_url
+        if file_changed:
+            # Stale analysis of the old file
+            track.bitrate = track.sample_rate = track.waveform = None
+
+        bump_catalog_version(db)
+        db.commit()
+        catalog_cache.clear()
+        db.refresh(track)
+        return track, file_changed
+
+    track, file_changed = await run_in_threadpool(save_track)
+    if file_changed:
+        audio_jobs.submit(track.id, track.file_url)
     return track
 
 @router.delete("/{id}", status_code=204)
@@ -97,12 +270,19 @@ def delete_track(id: int, db: Session = Depends(get_db), current_user: user_sche
     if not track:
         raise HTTPException(status_code=404, detail=f'Track with id {id} not found')
 
-    # Delete associated music file if it exists
-    if track.file_url:
+    # Delete associated music file if it exists and no other track shares its content
+    shared = track.file_url and db.query(track_model.Track.id).filter(
+        track_model.Track.file_url == track.file_url,
+        track_model.Track.id != track.id
+    ).first()
+    if track.file_url and not shared:
         file_path = os.path.join("app/static", track.file_url.strip("/"))
         if os.path.exists(file_path):
             os.remove(file_path)
 
     db.delete(track)
+    bump_catalog_version(db)
     db.commit()
+    catalog_cache.clear()
+    top_tracks.remove(id)
     return {"detail": f"Track with id {id} and associated file (if any) deleted successfully"}
@@ -1,13 +1,14 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException , status
+from fastapi import APIRouter, Depends, HTTPException , Query, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.core.security import get_current_admin_user, get_current_user
-from app.database import get_db
+from app.api.endpoints.tracks import ranked_tracks, tracks_by_id
+from app.core.recommender import recommender
+from app.core.security import get_current_admin_user, get_current_user, password_hasher
+from app.database import get_async_db, get_db, get_read_db
 from app.models import user as user_model
-from app.schemas import user as user_schema
-from passlib.context import CryptContext
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.schemas import track as track_schema, user as user_schema
 
 # Create a new router for user-related endpoints
 router = APIRouter(
@@ -16,34 +17,38 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=user_schema.UserOut, status_code=status.HTTP_201_CREATED)
-def create_user(request: user_schema.UserCreate, db: Session = Depends(get_db)):
+async def create_user(request: user_schema.UserCreate, db: Session = Depends(get_db)):
     # Optional: check if user already exists
-    existing_user = db.query(user_model.User).filter(user_model.User.email == request.email).first()
+    existing_user = await run_in_threadpool(
+        lambda: db.query(user_model.User).filter(user_model.User.email == request.email).first()
+    )
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    # Hash the password before storing it
-    hashed_password = pwd_context.hash(request.password)
+    # Hash the password before storing it (in the hashing pool, off the request threadpool)
+    hashed_password = await password_hasher.hash(request.password)
 
     # Create a new user instance and add it to the database
+    def save_user():
+        new_user = user_model.User(
+            email=request.email,
+            password=hashed_password ,
+            role=request.role
+        )
+        db.add(new_user)
+        db.commit()
+        db.refresh(new_user)
+        return new_user
 
-    new_user = user_model.User(
-        email=request.email,
-        password=hashed_password ,
-        role=request.role # You should hash this before storing!
-    )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    return new_user
+    return await run_in_threadpool(save_user)
 
 @router.get("/", response_model=List[user_schema.ShowUser])
-def get_all_users(db: Session = Depends(get_db)):
+def get_all_users(db: Session = Depends(get_read_db)):
     users = db.query(user_model.User).all()
     return users
 
 @router.get('/{id}', response_model=user_schema.ShowUser, status_code=status.HTTP_200_OK,dependencies=[Depends(get_current_admin_user)])
-def get_user(id: int, db: Session = Depends(get_db)):
+def get_user(id: int, db: Session = Depends(get_read_db)):
     user = db.query(user_model.User).filter(user_model.User.id == id).first()
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f'User with id {id} not found')
@@ -73,4 +78,18 @@ def delete_user(id: int, db: Session = Depends(get_db), current_user: user_schem
     
     db.delete(user)
     db.commit()
-    return {"detail": "User deleted successfully"}
\ No newline at end of file
+    return {"detail": "User deleted successfully"}
+
+
+@router.get('/{id}/recommendations', response_model=List[track_schema.TrackRecommendation])
+async def get_recommendations(
+    id: int,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: user_schema.UserBase = Depends(get_current_user)
+):
+    # Tracks most similar to what the user already likes
+    if recommender.index is None:
+        raise HTTPException(status_code=503, detail="Recommendations are not ready yet")
+    ids, scores = recommender.recommend(id, limit)
+    return ranked_tracks(await tracks_by_id(db, ids), ids, scores)
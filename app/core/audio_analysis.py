@@ -0,0 +1,255 @@
+"""Audio header parsing and waveform peaks.
+
+Everything here is CPU-bound and free of app/DB imports so it can run in a
+worker process. `analyze_file` is the entry point.
+"""
+import os
+import shutil
+import struct
+import subprocess
+from typing import Optional
+import numpy as np
+
+# MPEG audio tables, indexed by [version][layer] and bitrate index (kbps)
+_MPEG1_BITRATES = {
+    1: (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    2: (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+}
+_MPEG2_BITRATES = {
+    1: (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    3: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MPEG_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),  # MPEG 1
+    2: (22050, 24000, 16000),  # MPEG 2
+    0: (11025, 12000, 8000),   # MPEG 2.5
+}
+
+# Sample rate used when decoding compressed audio for peaks
+_DECODE_RATE = 8000
+
+
+def analyze_file(path: str, points: int = 800) -> dict:
+    """Return duration (s), bitrate (kbps), sample_rate (Hz) and waveform peaks.
+
+    `waveform` is at most `points` bytes, each the bucket's peak amplitude
+    scaled to 0-255, or None when the samples could not be decoded.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".wav":
+        info = _wav_info(path)
+        info["waveform"] = _wav_peaks(path, info.pop("_layout"), points)
+    elif ext == ".mp3":
+        info = _mp3_info(path)
+        info["waveform"] = _decoded_peaks(path, points)
+    elif ext == ".ogg":
+        info = _ogg_info(path)
+        info["waveform"] = _decoded_peaks(path, points)
+    else:
+        raise ValueError(f"Unsupported audio format: {ext}")
+
+    if info.get("duration") is not None:
+        info["duration"] = int(round(info["duration"]))
+    if info.get("bitrate") is not None:
+        info["bitrate"] = int(round(info["bitrate"]))
+    return info
+
+
+# ---------- WAV ----------
+
+def _wav_info(path: str) -> dict:
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        riff, _, wave = struct.unpack("<4sI4s", f.read(12))
+        if riff != b"RIFF" or wave != b"WAVE":
+            raise ValueError("Not a RIFF/WAVE file")
+
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError("WAV file has no data chunk")
+            chunk_id, chunk_size = struct.unpack("<4sI", header)
+            if chunk_id == b"fmt ":
+                body = f.read(chunk_size)
+                audio_format, channels, sample_rate, byte_rate, block_align, bits = struct.unpack("<HHIIHH", body[:16])
+                if audio_format == 0xFFFE and len(body) >= 26:
+                    audio_format = struct.unpack("<H", body[24:26])[0]  # WAVE_FORMAT_EXTENSIBLE sub-format
+                fmt = (audio_format, channels, sample_rate, byte_rate, block_align, bits)
+                f.seek(chunk_size & 1, os.SEEK_CUR)
+            elif chunk_id == b"data":
+                if fmt is None:
+                    raise ValueError("WAV data chunk before fmt chunk")
+                offset = f.tell()
+                # Streamed WAVs may leave the size unset; trust the file instead
+                data_size = min(chunk_size, size - offset)
+                break
+            else:
+                f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+    audio_format, channels, sample_rate, byte_rate, block_align, bits = fmt
+    return {
+        "duration": data_size / byte_rate if byte_rate else None,
+        "bitrate": byte_rate * 8 / 1000,
+        "sample_rate": sample_rate,
+        "_layout": (audio_format, channels, block_align, bits, offset, data_size),
+    }
+
+
+def _wav_peaks(path: str, layout: tuple, points: int) -> Optional[bytes]:
+    audio_format, channels, block_align, bits, offset, data_size = layout
+    frames = data_size // block_align if block_align else 0
+    if not frames or not channels:
+        return None
+
+    width = bits // 8
+    if audio_format == 3 and width in (4, 8):
+        full_scale = 1.0
+    elif audio_format == 1 and width in (1, 2, 3, 4):
+        full_scale = float(2 ** (8 * width - 1))
+    else:
+        return None  # Compressed WAV payloads (ADPCM, etc.)
+
+    # Memory-mapped so large files are scanned bucket by bucket
+    raw = np.memmap(path, dtype=np.uint8, mode="r", offset=offset, shape=(frames * block_align,))
+    raw = raw.reshape(frames, block_align)[:, :channels * width]
+
+    def decode(block):
+        if audio_format == 3:
+            return np.ascontiguousarray(block).view(f"<f{width}").astype(np.float64)
+        if width == 1:
+            return block.astype(np.float64) - 128.0  # 8-bit PCM is unsigned
+        # Little-endian signed integers of 2, 3 or 4 bytes
+        samples = block.reshape(len(block), channels, width).astype(np.int64)
+        value = np.zeros(samples.shape[:2], dtype=np.int64)
+        for i in range(width):
+            value |= samples[:, :, i] << (8 * i)
+        sign = 1 << (8 * width - 1)
+        return ((value ^ sign) - sign).astype(np.float64)
+
+    edges = np.linspace(0, frames, min(points, frames) + 1).astype(np.int64)
+    peaks = np.empty(len(edges) - 1, dtype=np.float64)
+    for i in range(len(peaks)):
+        peaks[i] = np.abs(decode(raw[edges[i]:edges[i + 1]])).max()
+    return _quantize(peaks / full_scale)
+
+
+# ---------- MP3 ----------
+
+def _mp3_info(path: str) -> dict:
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        head = f.read(10)
+        start = 0
+        if head[:3] == b"ID3":
+            # Skip the ID3v2 tag (syncsafe size, plus optional footer)
+            tag_size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+            start = 10 + tag_size + (10 if head[5] & 0x10 else 0)
+        f.seek(start)
+        buf = f.read(64 * 1024)
+        f.seek(max(size - 128, 0))
+        has_id3v1 = f.read(3) == b"TAG"
+
+    frame = None
+    for pos in range(len(buf) - 4):
+        if buf[pos] == 0xFF and buf[pos + 1] & 0xE0 == 0xE0:
+            frame = _mpeg_frame_header(buf[pos:pos + 4])
+            if frame is not None:
+                break
+    if frame is None:
+        raise ValueError("No MPEG audio frame found")
+
+    version, layer, bitrate, sample_rate, mono = frame
+    samples_per_frame = 384 if layer == 1 else (1152 if layer == 2 or version == 3 else 576)
+    audio_bytes = size - start - pos - (128 if has_id3v1 else 0)
+
+    # VBR files carry a Xing/Info or VBRI header with the real frame count
+    frames = None
+    side_info = (32 if not mono else 17) if version == 3 else (17 if not mono else 9)
+    xing = buf[pos + 4 + side_info:pos + 4 + side_info + 16]
+    if xing[:4] in (b"Xing", b"Info"):
+        flags = struct.unpack(">I", xing[4:8])[0]
+        if flags & 1:
+            frames = struct.unpack(">I", xing[8:12])[0]
+    elif buf[pos + 36:pos + 40] == b"VBRI":
+        frames = struct.unpack(">I", buf[pos + 50:pos + 54])[0]
+
+    if frames:
+        duration = frames * samples_per_frame / sample_rate
+        bitrate = audio_bytes * 8 / duration / 1000 if duration else bitrate
+    else:
+        duration = audio_bytes * 8 / (bitrate * 1000)
+    return {"duration": duration, "bitrate": bitrate, "sample_rate": sample_rate}
+
+
+def _mpeg_frame_header(header: bytes):
+    value = struct.unpack(">I", header)[0]
+    version = (value >> 19) & 3
+    layer = 4 - ((value >> 17) & 3)
+    bitrate_index = (value >> 12) & 15
+    rate_index = (value >> 10) & 3
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None  # Reserved values: not a real frame header
+    table = _MPEG1_BITRATES if version == 3 else _MPEG2_BITRATES
+    mono = ((value >> 6) & 3) == 3
+    return version, layer, table[layer][bitrate_index], _MPEG_SAMPLE_RATES[version][rate_index], mono
+
+
+# ---------- Ogg (Vorbis / Opus) ----------
+
+def _ogg_info(path: str) -> dict:
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        first = f.read(4096)
+        f.seek(max(size - 65536, 0))
+        tail = f.read()
+
+    if first[:4] != b"OggS":
+        raise ValueError("Not an Ogg file")
+    segments = first[26]
+    packet = first[27 + segments:]
+    if packet[:7] == b"\x01vorbis":
+        sample_rate, _, nominal = struct.unpack("<IiI", packet[12:24])[:3]
+        pre_skip = 0
+        granule_rate = sample_rate
+    elif packet[:8] == b"OpusHead":
+        pre_skip, sample_rate = struct.unpack("<HI", packet[10:16])
+        granule_rate = 48000  # Opus granules always count 48 kHz samples
+        nominal = 0
+    else:
+        raise ValueError("Unsupported Ogg codec")
+
+    # The last page's granule position is the stream length in samples
+    last = tail.rfind(b"OggS")
+    granule = struct.unpack("<q", tail[last + 6:last + 14])[0] if last >= 0 else -1
+    duration = (granule - pre_skip) / granule_rate if granule > 0 else None
+    if duration:
+        bitrate = size * 8 / duration / 1000
+    else:
+        bitrate = nominal / 1000 if nominal > 0 else None
+    return {"duration": duration, "bitrate": bitrate, "sample_rate": sample_rate}
+
+
+# ---------- Peaks ----------
+
+def _decoded_peaks(path: str, points: int) -> Optional[bytes]:
+    # Compressed formats need a decoder; use ffmpeg when the host has it
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        return None
+    result = subprocess.run(
+        [ffmpeg, "-v", "error", "-i", path, "-ac", "1", "-ar", str(_DECODE_RATE), "-f", "s16le", "-"],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=False,
+    )
+    samples = np.frombuffer(result.stdout, dtype="<i2")
+    if result.returncode != 0 or not len(samples):
+        return None
+    edges = np.linspace(0, len(samples), min(points, len(samples)) + 1).astype(np.int64)
+    peaks = np.maximum.reduceat(np.abs(samples.astype(np.int32)), edges[:-1])
+    return _quantize(peaks / 32768.0)
+
+
+def _quantize(peaks: np.ndarray) -> bytes:
+    return np.clip(np.round(peaks * 255), 0, 255).astype(np.uint8).tobytes()
@@ -0,0 +1,113 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Set
+from sqlalchemy import select, update
+from app.core.audio_analysis import analyze_file
+from app.core.catalog_cache import catalog_cache
+from app.core.config import settings
+from app.core.process_pool import discard_pool, spawn_pool
+from app.database import AsyncSessionLocal
+from app.models import track as track_model
+
+STATIC_ROOT = "app/static"
+
+
+class AudioAnalysisQueue:
+    """Runs audio analysis in a process pool and stores the results on the track.
+
+    Jobs are fire-and-forget from the request's point of view: uploads return
+    as soon as the file is stored, and duration/bitrate/sample rate/waveform
+    show up once the worker finishes.
+    """
+
+    def __init__(self, session_factory, workers: int = 2, points: int = 800):
+        self.session_factory = session_factory
+        self.workers = workers
+        self.points = points
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._jobs: Set[asyncio.Task] = set()
+
+    def submit(self, track_id: int, file_url: str):
+        path = os.path.join(STATIC_ROOT, file_url.strip("/"))
+        job = asyncio.get_running_loop().create_task(self._analyze(track_id, file_url, path))
+        self._jobs.add(job)
+        job.add_done_callback(self._jobs.discard)
+
+    async def backfill(self) -> int:
+        """Queue every track with a file that has not been analyzed yet."""
+        async with self.session_factory() as db:
+            rows = (await db.execute(
+                select(track_model.Track.id, track_model.Track.file_url).where(
+                    track_model.Track.file_url.is_not(None),
+                    track_model.Track.sample_rate.is_(None),
+                )
+            )).all()
+        for track_id, file_url in rows:
+            self.submit(track_id, file_url)
+        return len(rows)
+
+    async def stop(self):
+        for job in list(self._jobs):
+            job.cancel()
+        if self._pool is not None:
+            self._discard(self._pool)
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = spawn_pool(self.workers)
+        return self._pool
+
+    def _discard(self, pool: ProcessPoolExecutor):
+        # Every job queued on a broken pool fails with it; only the first replaces it
+        if self._pool is pool:
+            self._pool = None
+            discard_pool(pool)
+
+    async def _run(self, path: str) -> dict:
+        """analyze_file in the pool, retried once on a fresh pool if a worker died."""
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            pool = self._executor()
+            try:
+                return await loop.run_in_executor(pool, analyze_file, path, self.points)
+            except BrokenProcessPool:
+                self._discard(pool)
+                if attempt:
+                    raise
+
+    async def _analyze(self, track_id: int, file_url: str, path: str):
+        try:
+            info = await self._run(path)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Audio analysis failed for track {track_id} ({path}): {e}")
+            return
+
+        values = {k: v for k, v in info.items() if v is not None}
+        if not values:
+            return
+        async with self.session_factory() as db:
+            # Skip the write if the track's file was replaced while we were working
+            result = await db.execute(
+                update(track_model.Track)
+                .where(track_model.Track.id == track_id, track_model.Track.file_url == file_url)
+                .values(**values)
+            )
+            if result.rowcount:
+                await db.execute(
+                    update(track_model.CatalogVersion)
+                    .where(track_model.CatalogVersion.id == 1)
+                    .values(version=track_model.CatalogVersion.version + 1)
+                )
+            await db.commit()
+        catalog_cache.clear()
+
+
+audio_jobs = AudioAnalysisQueue(
+    AsyncSessionLocal,
+    workers=settings.AUDIO_ANALYSIS_WORKERS,
+    points=settings.WAVEFORM_POINTS,
+)
@@ -0,0 +1,44 @@
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class CatalogCache:
+    """Bounded LRU of serialized catalog pages, tagged with the catalog version.
+
+    Entries cached under an older version are discarded the first time a
+    newer version is seen, and write paths clear the cache outright.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.version: Optional[int] = None
+        self._pages: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, version: int, key: Hashable) -> Optional[Any]:
+        if version != self.version:
+            self.clear()
+            self.version = version
+        entry = self._pages.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._pages.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, version: int, key: Hashable, entry: Any):
+        if version != self.version:
+            return
+        self._pages[key] = entry
+        self._pages.move_to_end(key)
+        while len(self._pages) > self.max_entries:
+            self._pages.popitem(last=False)
+
+    def clear(self):
+        self._pages.clear()
+        self.version = None
+
+
+catalog_cache = CatalogCache()
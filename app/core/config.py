@@ -1,11 +1,109 @@
 from pydantic_settings import BaseSettings
 
+
+def to_async_url(url: str) -> str:
+    """Swap a sync driver prefix for its async driver (aiosqlite / asyncpg)."""
+    for sync_prefix, async_prefix in (
+        ("sqlite://", "sqlite+aiosqlite://"),
+        ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+        ("postgresql://", "postgresql+asyncpg://"),
+        ("postgres://", "postgresql+asyncpg://"),
+    ):
+        if url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix):]
+    return url
+
+
 class Settings(BaseSettings):
     APP_NAME: str
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     DATABASE_URL: str
+    # Defaults to DATABASE_URL with its async driver (aiosqlite / asyncpg)
+    ASYNC_DATABASE_URL: str | None = None
+    # Optional read replica for read-only endpoints. After a write, that client
+    # reads from the primary for READ_YOUR_WRITES_SECONDS to hide replication lag
+    READ_DATABASE_URL: str | None = None
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+
+    # Connection pools, per engine and per worker. Recycle is in seconds (-1: never);
+    # pre-ping tests each connection on checkout, which costs a round trip
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = False
+
+    # SQLite only: applied to every new connection
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_CACHED_STATEMENTS: int = 256
+
+    # Startup: create missing tables in the lifespan (off by default, see app/init_db.py),
+    # connections opened per engine and whether to start the bcrypt workers before /ready
+    CREATE_SCHEMA_ON_STARTUP: bool = False
+    WARMUP_DB_CONNECTIONS: int = 2
+    WARMUP_PASSWORD_HASHER: bool = True
+
+    # Password hashing: bcrypt cost, worker processes (default: one per core) and max queued hashes
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int | None = None
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    # Request instrumentation: slow-request log threshold, and how often one statement
+    # may repeat within a request before it is reported as a likely N+1
+    SLOW_REQUEST_SECONDS: float = 0.5
+    REPEATED_QUERY_THRESHOLD: int = 10
+
+    # Verified JWT claims kept in memory (LRU, entries expire with the token)
+    AUTH_TOKEN_CACHE_SIZE: int = 10000
+
+    # Largest accepted audio upload
+    MAX_UPLOAD_BYTES: int = 50 * 1024 * 1024
+
+    # Background audio analysis (duration, bitrate, waveform peaks)
+    AUDIO_ANALYSIS_WORKERS: int = 2
+    WAVEFORM_POINTS: int = 800
+
+    # Seconds before /tracks/top reloads like counts written by other workers
+    TOP_TRACKS_RESYNC_INTERVAL: float = 60.0
+
+    # Item-item recommendations built from likes
+    RECOMMENDER_TOP_K: int = 50
+    RECOMMENDER_MAX_USER_LIKES: int = 500
+    RECOMMENDER_REFRESH_INTERVAL: float = 30.0
+    RECOMMENDER_REBUILD_INTERVAL: float = 3600.0
+
+    # Write-behind persistence for chat messages
+    CHAT_WRITE_BATCH_SIZE: int = 200
+    CHAT_WRITE_FLUSH_INTERVAL: float = 0.05  # seconds
+    CHAT_WRITE_QUEUE_SIZE: int = 10000
+    # Most messages returned by one reconnect sync batch
+    CHAT_SYNC_BATCH_SIZE: int = 500
+
+    # Per-connection outbound WebSocket queues
+    WS_SEND_QUEUE_SIZE: int = 256
+    WS_SLOW_CONSUMER_POLICY: str = "drop_oldest"  # or "disconnect"
+
+    # Routing of WebSocket messages between workers: "inprocess" or "unix"
+    WS_ROUTING_BACKEND: str = "inprocess"
+    WS_ROUTING_SOCKET: str = "/tmp/spotify_api_ws.sock"
+
+    # Presence changes are coalesced into one diff per subscriber per window
+    PRESENCE_COALESCE_WINDOW: float = 0.5  # seconds
+    PRESENCE_MAX_IDS_PER_FRAME: int = 200  # user ids in one subscribe/unsubscribe frame
+    PRESENCE_MAX_SUBSCRIPTIONS: int = 1000  # users one watcher may follow at once
+
+    @property
+    def async_database_url(self) -> str:
+        return self.ASYNC_DATABASE_URL or to_async_url(self.DATABASE_URL)
+
+    @property
+    def async_read_database_url(self) -> str | None:
+        return to_async_url(self.READ_DATABASE_URL) if self.READ_DATABASE_URL else None
 
     class Config:
         env_file = "./app/.env"
@@ -0,0 +1,53 @@
+"""Delivery state of chat messages and the reconnect sync query.
+
+A message is stored as delivered when its receiver was connected at send
+time, and as queued (is_delivered=False) otherwise. Queued messages are
+flipped to delivered once they reach the receiver, either pushed after they
+are saved or in a sync batch.
+"""
+from collections import defaultdict
+from typing import Dict, List
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.message import Message
+
+
+def message_frame(message_id: int, sender_id: int, receiver_id: int, content: str, timestamp) -> dict:
+    return {
+        "type": "chat_message",
+        "id": message_id,
+        "sender_id": sender_id,
+        "receiver_id": receiver_id,
+        "message": content,
+        "timestamp": timestamp.isoformat() if timestamp is not None else None,
+    }
+
+
+async def messages_since(db: AsyncSession, receiver_id: int, after_id: int, limit: int):
+    """Messages received after `after_id` across all conversations: one range scan on (receiver_id, id)."""
+    result = await db.execute(
+        select(Message.id, Message.sender_id, Message.content, Message.timestamp)
+        .where(Message.receiver_id == receiver_id, Message.id > after_id)
+        .order_by(Message.id)
+        .limit(limit)
+    )
+    return result.all()
+
+
+async def mark_delivered(db: AsyncSession, receiver_id: int, *criteria) -> Dict[int, List[int]]:
+    """Flip queued messages matching `criteria` to delivered.
+
+    Returns {sender_id: [message ids]} for the rows that changed, so senders
+    can be told.
+    """
+    result = await db.execute(
+        update(Message)
+        .where(Message.receiver_id == receiver_id, Message.is_delivered.is_(False), *criteria)
+        .values(is_delivered=True)
+        .returning(Message.id, Message.sender_id)
+    )
+    delivered: Dict[int, List[int]] = defaultdict(list)
+    for message_id, sender_id in result.all():
+        delivered[sender_id].append(message_id)
+    await db.commit()
+    return delivered
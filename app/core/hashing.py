@@ -0,0 +1,109 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from app.core.process_pool import discard_pool, spawn_pool
+
+
+@lru_cache(maxsize=None)
+def crypt_context(rounds: int) -> CryptContext:
+    """bcrypt context that treats any other cost as outdated, so hashes get upgraded on login."""
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
+
+# Run in the worker processes
+def _hash(password: str, rounds: int) -> str:
+    return crypt_context(rounds).hash(password)
+
+
+def _verify_and_update(password: str, hashed: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    return crypt_context(rounds).verify_and_update(password, hashed)
+
+
+def _warm(rounds: int) -> int:
+    crypt_context(rounds)
+    return os.getpid()
+
+
+class PasswordHasher:
+    """bcrypt in a dedicated process pool, off the event loop and the request threadpool.
+
+    At most `max_pending` hashes may be queued or running; beyond that callers
+    get a 503 straight away instead of waiting behind a login storm. If a
+    worker dies the pool is replaced and the call retried once.
+    """
+
+    def __init__(self, rounds: int = 12, workers: Optional[int] = None, max_pending: int = 64):
+        self.rounds = rounds
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(_hash, password, self.rounds)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """(matches, new hash if the stored one uses an outdated cost, else None)."""
+        return await self._submit(_verify_and_update, password, hashed, self.rounds)
+
+    async def warmup(self):
+        """Start the worker processes and build their contexts before the first login arrives."""
+        loop = asyncio.get_running_loop()
+        pool = self._executor()
+        try:
+            await asyncio.gather(*(loop.run_in_executor(pool, _warm, self.rounds) for _ in range(self.workers)))
+        except BrokenProcessPool:
+            self._discard(pool)  # A worker failed to start; the next attempt gets a fresh pool
+            raise
+
+    async def _submit(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many password checks in progress, try again shortly",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            for _ in range(2):
+                pool = self._executor()
+                try:
+                    return await loop.run_in_executor(pool, fn, *args)
+                except BrokenProcessPool:
+                    self._discard(pool)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Password hashing is unavailable, try again shortly",
+                headers={"Retry-After": "1"},
+            )
+        finally:
+            self.pending -= 1
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = spawn_pool(self.workers)
+        return self._pool
+
+    def _discard(self, pool: ProcessPoolExecutor):
+        # Concurrent callers all see the same broken pool; only the first replaces it
+        if self._pool is pool:
+            self._pool = None
+            discard_pool(pool)
+
+    def stop(self):
+        if self._pool is not None:
+            self._discard(self._pool)
@@ -0,0 +1,112 @@
+"""Incremental maintenance of the conversation_summaries inbox table.
+
+Stored messages are folded into one upsert per batch (last message wins,
+unread counts are added). Advancing a read watermark recounts that reader's
+unread messages past the watermark, which only scans unread rows.
+"""
+from typing import Dict, List, Tuple
+from sqlalchemy import case, delete, func, insert, select, union_all, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, aliased
+from app.models.message import ConversationSummary, Message, ReadWatermark
+
+PREVIEW_LENGTH = 120
+
+LAST_MESSAGE_FIELDS = ("last_message_id", "last_sender_id", "last_message_preview", "last_message_at")
+
+
+def summary_rows(batch: List[dict], ids: List[int]) -> List[dict]:
+    """Fold stored messages into one row per (participant, conversation)."""
+    summaries: Dict[Tuple[int, str], dict] = {}
+    for row, message_id in zip(batch, ids):
+        sender_id, receiver_id, key = row["sender_id"], row["receiver_id"], row["conversation_key"]
+        for user_id, other_user_id in ((sender_id, receiver_id), (receiver_id, sender_id)):
+            entry = summaries.setdefault((user_id, key), {
+                "user_id": user_id,
+                "other_user_id": other_user_id,
+                "conversation_key": key,
+                "last_message_id": 0,
+                "unread_count": 0,
+            })
+            if message_id > entry["last_message_id"]:
+                entry.update(
+                    last_message_id=message_id,
+                    last_sender_id=sender_id,
+                    last_message_preview=(row["content"] or "")[:PREVIEW_LENGTH],
+                    last_message_at=row["timestamp"],
+                )
+        if receiver_id != sender_id:
+            summaries[(receiver_id, key)]["unread_count"] += 1
+    return list(summaries.values())
+
+
+def summary_upsert(dialect_name: str, rows: List[dict]):
+    if dialect_name == "postgresql":
+        insert_stmt = postgresql_insert(ConversationSummary)
+    else:
+        insert_stmt = sqlite_insert(ConversationSummary)
+
+    insert_stmt = insert_stmt.values(rows)
+    newer = insert_stmt.excluded.last_message_id > ConversationSummary.last_message_id
+    set_ = {
+        field: case((newer, insert_stmt.excluded[field]), else_=getattr(ConversationSummary, field))
+        for field in LAST_MESSAGE_FIELDS
+    }
+    set_["unread_count"] = ConversationSummary.unread_count + insert_stmt.excluded.unread_count
+    return insert_stmt.on_conflict_do_update(index_elements=["user_id", "conversation_key"], set_=set_)
+
+
+def _unread_after_watermark(user_id, key):
+    # correlate_except: user_id/key may be columns of a query two levels up (see rebuild_summaries)
+    watermark = select(ReadWatermark.last_seen_message_id).where(
+        ReadWatermark.reader_id == user_id, ReadWatermark.conversation_key == key
+    ).correlate_except(ReadWatermark).scalar_subquery()
+    return select(func.count()).select_from(Message).where(
+        Message.conversation_key == key,
+        Message.receiver_id == user_id,
+        Message.id > func.coalesce(watermark, 0),
+    ).correlate_except(Message).scalar_subquery()
+
+
+def unread_recount(reader_id: int, key: str):
+    """Reset the reader's unread count to what is left past their (just advanced) watermark."""
+    return (
+        update(ConversationSummary)
+        .where(ConversationSummary.user_id == reader_id, ConversationSummary.conversation_key == key)
+        .values(unread_count=_unread_after_watermark(reader_id, key))
+    )
+
+
+def rebuild_summaries(db: Session):
+    """Recompute every inbox entry from messages and read watermarks, e.g. for existing history."""
+    sides = union_all(
+        select(
+            Message.sender_id.label("user_id"), Message.receiver_id.label("other_user_id"),
+            Message.conversation_key, Message.id,
+        ),
+        select(Message.receiver_id, Message.sender_id, Message.conversation_key, Message.id),
+    ).subquery()
+    latest = (
+        select(sides.c.user_id, sides.c.other_user_id, sides.c.conversation_key, func.max(sides.c.id).label("last_id"))
+        .group_by(sides.c.user_id, sides.c.other_user_id, sides.c.conversation_key)
+        .subquery()
+    )
+    last = aliased(Message)
+    rows = select(
+        latest.c.user_id,
+        latest.c.other_user_id,
+        latest.c.conversation_key,
+        latest.c.last_id,
+        last.sender_id,
+        func.coalesce(func.substr(last.content, 1, PREVIEW_LENGTH), ""),
+        last.timestamp,
+        _unread_after_watermark(latest.c.user_id, latest.c.conversation_key),
+    ).join(last, last.id == latest.c.last_id)
+
+    db.execute(delete(ConversationSummary))
+    db.execute(insert(ConversationSummary).from_select([
+        "user_id", "other_user_id", "conversation_key", "last_message_id", "last_sender_id",
+        "last_message_preview", "last_message_at", "unread_count",
+    ], rows))
+    db.commit()
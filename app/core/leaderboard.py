@@ -0,0 +1,145 @@
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class _Bucket:
+    """All tracks that currently have exactly `count` likes, in arrival order."""
+
+    __slots__ = ("count", "tracks", "higher", "lower")
+
+    def __init__(self, count: int):
+        self.count = count
+        self.tracks: Dict[int, None] = {}
+        self.higher: Optional["_Bucket"] = None
+        self.lower: Optional["_Bucket"] = None
+
+
+class Leaderboard:
+    """In-memory ranking of tracks by like count.
+
+    Tracks are grouped into buckets of equal count, kept in a doubly linked
+    list ordered by count. A like or unlike moves one track to the neighbouring
+    bucket, so updates are O(1); reading the top k walks down from the highest
+    bucket and is O(k). Ties keep the order in which tracks reached the count.
+    """
+
+    def __init__(self):
+        self._bucket_of: Dict[int, _Bucket] = {}
+        self._top: Optional[_Bucket] = None
+        self._bottom: Optional[_Bucket] = None
+        self._lock = threading.Lock()  # Sync like endpoints run in the threadpool
+        self.loaded_at: Optional[float] = None
+
+    def load(self, counts: Iterable[Tuple[int, int]]):
+        """Rebuild from (track_id, like_count) pairs."""
+        buckets: Dict[int, _Bucket] = {}
+        bucket_of: Dict[int, _Bucket] = {}
+        for track_id, count in sorted(counts):
+            if count > 0:
+                bucket = buckets.get(count)
+                if bucket is None:
+                    bucket = buckets[count] = _Bucket(count)
+                bucket.tracks[track_id] = None
+                bucket_of[track_id] = bucket
+
+        top = bottom = None
+        for count in sorted(buckets):  # Link lowest to highest
+            bucket = buckets[count]
+            if bottom is None:
+                bottom = bucket
+            bucket.lower = top
+            if top is not None:
+                top.higher = bucket
+            top = bucket
+
+        with self._lock:
+            self._bucket_of, self._top, self._bottom = bucket_of, top, bottom
+            self.loaded_at = time.monotonic()
+
+    def is_stale(self, max_age: float) -> bool:
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > max_age
+
+    def increment(self, track_id: int):
+        with self._lock:
+            current = self._bucket_of.get(track_id)
+            if current is None:
+                lowest = self._bottom
+                if lowest is not None and lowest.count == 1:
+                    target = lowest
+                else:
+                    target = self._link(_Bucket(1), lower=None, higher=lowest)
+            else:
+                target = current.higher
+                if target is None or target.count != current.count + 1:
+                    target = self._link(_Bucket(current.count + 1), lower=current, higher=current.higher)
+                self._detach(track_id, current)
+            target.tracks[track_id] = None
+            self._bucket_of[track_id] = target
+
+    def decrement(self, track_id: int):
+        with self._lock:
+            current = self._bucket_of.get(track_id)
+            if current is None:
+                return
+            if current.count == 1:
+                self._detach(track_id, current)
+                del self._bucket_of[track_id]
+                return
+            target = current.lower
+            if target is None or target.count != current.count - 1:
+                target = self._link(_Bucket(current.count - 1), lower=current.lower, higher=current)
+            self._detach(track_id, current)
+            target.tracks[track_id] = None
+            self._bucket_of[track_id] = target
+
+    def remove(self, track_id: int):
+        with self._lock:
+            current = self._bucket_of.pop(track_id, None)
+            if current is not None:
+                self._detach(track_id, current)
+
+    def top(self, k: int) -> List[Tuple[int, int]]:
+        """The k most liked tracks as (track_id, like_count), highest first."""
+        result: List[Tuple[int, int]] = []
+        with self._lock:
+            bucket = self._top
+            while bucket is not None and len(result) < k:
+                for track_id in bucket.tracks:
+                    result.append((track_id, bucket.count))
+                    if len(result) == k:
+                        break
+                bucket = bucket.lower
+        return result
+
+    def __len__(self) -> int:
+        return len(self._bucket_of)
+
+    def _link(self, bucket: _Bucket, lower: Optional[_Bucket], higher: Optional[_Bucket]) -> _Bucket:
+        bucket.lower, bucket.higher = lower, higher
+        if lower is not None:
+            lower.higher = bucket
+        else:
+            self._bottom = bucket
+        if higher is not None:
+            higher.lower = bucket
+        else:
+            self._top = bucket
+        return bucket
+
+    def _detach(self, track_id: int, bucket: _Bucket):
+        del bucket.tracks[track_id]
+        if bucket.tracks:
+            return
+        # Unlink empty buckets so reads never walk over them
+        if bucket.lower is not None:
+            bucket.lower.higher = bucket.higher
+        else:
+            self._bottom = bucket.higher
+        if bucket.higher is not None:
+            bucket.higher.lower = bucket.lower
+        else:
+            self._top = bucket.lower
+
+
+top_tracks = Leaderboard()
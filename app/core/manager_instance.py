@@ -1,3 +1,104 @@
+from collections import defaultdict
+from typing import Dict, List
+from app.core.config import settings
+from app.core.delivery import mark_delivered, message_frame
+from app.core.message_writer import MessageWriter
+from app.core.presence import PresenceTracker
+from app.core.pubsub import InProcessPubSub, UnixSocketPubSub
+from app.core.recommender import recommender
+from app.core.security import revoked_tokens
 from app.core.websocket_manager import ConnectionManager
+from app.database import AsyncSessionLocal
+from app.models.message import Message
 
-manager = ConnectionManager()
+if settings.WS_ROUTING_BACKEND == "unix":
+    routing_backend = UnixSocketPubSub(settings.WS_ROUTING_SOCKET)
+else:
+    routing_backend = InProcessPubSub()
+
+manager = ConnectionManager(
+    queue_size=settings.WS_SEND_QUEUE_SIZE,
+    slow_consumer_policy=settings.WS_SLOW_CONSUMER_POLICY,
+    backend=routing_backend,
+)
+
+# Tokens revoked on another worker
+manager.message_handlers["revoke_token"] = lambda message: revoked_tokens.revoke(
+    message["token_id"], message["expires_at"]
+)
+
+
+def apply_like_events(message: dict):
+    # Likes committed on another worker; folded in at this worker's next refresh
+    for track_id in message["liked"]:
+        recommender.record_like(message["user_id"], track_id)
+    for track_id in message["unliked"]:
+        recommender.record_unlike(message["user_id"], track_id)
+
+
+manager.message_handlers["like_events"] = apply_like_events
+
+presence = PresenceTracker(
+    manager,
+    window=settings.PRESENCE_COALESCE_WINDOW,
+    max_ids_per_frame=settings.PRESENCE_MAX_IDS_PER_FRAME,
+    max_subscriptions=settings.PRESENCE_MAX_SUBSCRIPTIONS,
+)
+
+
+async def report_failed_messages(batch: List[dict], error: Exception):
+    # Let each sender know which of their messages were not stored
+    for row in batch:
+        await manager.send_personal_message({
+            "type": "message_failed",
+            "receiver_id": row["receiver_id"],
+            "message": row["content"],
+            "error": "Message could not be saved",
+        }, row["sender_id"])
+
+
+async def notify_delivered(receiver_id: int, delivered: Dict[int, List[int]]):
+    for sender_id, message_ids in delivered.items():
+        await manager.send_personal_message({
+            "type": "delivered",
+            "receiver_id": receiver_id,
+            "message_ids": message_ids,
+        }, sender_id)
+
+
+async def announce_saved_messages(batch: List[dict], ids: List[int]):
+    """Send clients the ids of the messages they saw live, keyed by "ref".
+
+    A queued message whose receiver connected while it waited to be written
+    is pushed now and marked delivered.
+    """
+    saved = defaultdict(list)
+    late = defaultdict(list)
+    for row, message_id in zip(batch, ids):
+        ref = {"ref": row.get("ref"), "id": message_id}
+        saved[row["sender_id"]].append(ref)
+        if row["is_delivered"]:
+            saved[row["receiver_id"]].append(ref)
+        elif manager.is_online(row["receiver_id"]):
+            late[row["receiver_id"]].append(message_frame(
+                message_id, row["sender_id"], row["receiver_id"], row["content"], row["timestamp"]
+            ))
+
+    for user_id, messages in saved.items():
+        await manager.send_personal_message({"type": "message_ids", "messages": messages}, user_id)
+    for receiver_id, frames in late.items():
+        for frame in frames:
+            await manager.send_personal_message(frame, receiver_id)
+        async with AsyncSessionLocal() as db:
+            delivered = await mark_delivered(db, receiver_id, Message.id.in_([f["id"] for f in frames]))
+        await notify_delivered(receiver_id, delivered)
+
+
+message_writer = MessageWriter(
+    AsyncSessionLocal,
+    batch_size=settings.CHAT_WRITE_BATCH_SIZE,
+    flush_interval=settings.CHAT_WRITE_FLUSH_INTERVAL,
+    max_queue_size=settings.CHAT_WRITE_QUEUE_SIZE,
+    on_error=report_failed_messages,
+    on_saved=announce_saved_messages,
+)
@@ -0,0 +1,113 @@
+import asyncio
+from typing import Awaitable, Callable, List, Optional
+from sqlalchemy import insert
+from app.core.inbox import summary_rows, summary_upsert
+from app.models.message import Message
+
+MESSAGE_COLUMNS = frozenset(Message.__table__.columns.keys())
+
+
+class MessageWriter:
+    """Write-behind queue that persists chat messages in batched transactions.
+
+    Messages are delivered by the caller right away; rows are buffered in a
+    bounded queue and flushed once `batch_size` rows are waiting or
+    `flush_interval` seconds have passed, whichever comes first. After a batch
+    is stored, `on_saved` receives the rows and their new ids.
+
+    Row keys that are not Message columns (e.g. a client "ref") are passed
+    through to the callbacks but not inserted.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        batch_size: int = 200,
+        flush_interval: float = 0.05,
+        max_queue_size: int = 10000,
+        on_error: Optional[Callable[[List[dict], Exception], Awaitable[None]]] = None,
+        on_saved: Optional[Callable[[List[dict], List[int]], Awaitable[None]]] = None,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self.on_error = on_error
+        self.on_saved = on_saved
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._task = asyncio.create_task(self._run())
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def enqueue(self, row: dict):
+        # Blocks the producer when the queue is full so memory stays bounded
+        self.start()
+        await self._queue.put(row)
+
+    async def stop(self):
+        """Flush everything queued so far and stop the background task."""
+        if self._task is None or self._task.done():
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        while True:
+            row = await self._queue.get()
+            if row is None:
+                return
+
+            # Give a burst a moment to accumulate unless a full batch is already waiting
+            if self._queue.qsize() < self.batch_size - 1:
+                await asyncio.sleep(self.flush_interval)
+
+            batch = [row]
+            stopping = False
+            while len(batch) < self.batch_size and not self._queue.empty():
+                row = self._queue.get_nowait()
+                if row is None:
+                    stopping = True
+                    break
+                batch.append(row)
+
+            await self._flush(batch)
+            if stopping:
+                return
+
+    async def _flush(self, batch: List[dict]):
+        try:
+            ids = await self._write(batch)
+        except Exception as e:
+            print(f"Failed to persist {len(batch)} messages: {e}")
+            if self.on_error is not None:
+                await self.on_error(batch, e)
+            return
+
+        if self.on_saved is not None:
+            try:
+                await self.on_saved(batch, ids)
+            except Exception as e:
+                print(f"Failed to announce {len(batch)} saved messages: {e}")
+
+    async def _write(self, batch: List[dict]) -> List[int]:
+        rows = [{key: value for key, value in row.items() if key in MESSAGE_COLUMNS} for row in batch]
+        async with self.session_factory() as db:
+            try:
+                # One multi-row INSERT .. RETURNING; ids come back in batch order
+                result = await db.execute(insert(Message).returning(Message.id, sort_by_parameter_order=True), rows)
+                ids = list(result.scalars())
+                # Inbox entries of both participants move with the messages
+                await db.execute(summary_upsert(db.get_bind().dialect.name, summary_rows(batch, ids)))
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+        return ids
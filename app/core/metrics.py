@@ -0,0 +1,244 @@
+"""Request, SQL and WebSocket instrumentation rendered in Prometheus text format.
+
+MetricsMiddleware times every HTTP request and counts WebSocket frames;
+instrument_engine() hooks SQLAlchemy so each request knows how many statements
+it ran and how long they took. Requests slower than SLOW_REQUEST_SECONDS, or
+that repeat one statement REPEATED_QUERY_THRESHOLD times or more (a typical
+N+1), are printed together with their SQL.
+"""
+import threading
+import time
+from collections import Counter as StatementCounter
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import event
+from app.core.config import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Keep this many statements per request for the slow-request log
+MAX_RECORDED_STATEMENTS = 50
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for values, total in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, values)} {total}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...], labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        self._series: Dict[Tuple, list] = {}  # label values -> [bucket counts..., count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for values, series in sorted(self._series.items()):
+            for bound, count in zip(self.buckets, series):
+                labels = _format_labels(self.labels + ("le",), values + (bound,))
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labels + ("le",), values + ("+Inf",))
+            lines.append(f"{self.name}_bucket{labels} {series[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {series[-2]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {series[-1]}")
+        return lines
+
+
+def _render_samples(name: str, help: str, kind: str, samples: Dict[Tuple, float], labels: Tuple[str, ...]) -> List[str]:
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    for values, value in samples.items():
+        lines.append(f"{name}{_format_labels(labels, values)} {value}")
+    return lines
+
+
+def render_gauges(name: str, help: str, samples: Dict[Tuple, float], labels: Tuple[str, ...] = ()) -> List[str]:
+    return _render_samples(name, help, "gauge", samples, labels)
+
+
+def render_counters(name: str, help: str, samples: Dict[Tuple, float], labels: Tuple[str, ...] = ()) -> List[str]:
+    """Totals kept elsewhere that only ever grow; `name` gets the _total suffix."""
+    return _render_samples(f"{name}_total", help, "counter", samples, labels)
+
+
+http_requests = Counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+http_latency = Histogram("http_request_duration_seconds", "HTTP request latency.", LATENCY_BUCKETS, ("method", "route"))
+db_queries_per_request = Histogram(
+    "http_request_db_queries", "SQL statements executed per HTTP request.", QUERY_COUNT_BUCKETS, ("method", "route")
+)
+db_time_per_request = Histogram(
+    "http_request_db_seconds", "Total SQL time per HTTP request.", LATENCY_BUCKETS, ("method", "route")
+)
+db_queries = Counter("db_queries_total", "SQL statements executed, inside or outside requests.")
+db_seconds = Counter("db_query_seconds_total", "Time spent executing SQL statements.")
+slow_requests = Counter("http_slow_requests_total", "Requests slower than SLOW_REQUEST_SECONDS.", ("method", "route"))
+repeated_query_requests = Counter(
+    "http_repeated_query_requests_total",
+    "Requests that ran one statement at least REPEATED_QUERY_THRESHOLD times (likely N+1).",
+    ("method", "route"),
+)
+websocket_frames = Counter("websocket_frames_total", "WebSocket frames by direction.", ("direction",))
+websocket_sessions = Counter("websocket_sessions_total", "WebSocket sessions opened, by route.", ("route",))
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_time", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements: List[str] = []
+
+
+# Set for the duration of each HTTP request; threadpool calls inherit it
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def instrument_engine(engine):
+    """Time every statement on `engine` (pass async_engine.sync_engine for async engines)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        _record_statement(conn, statement)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        # Failed statements never reach after_cursor_execute; they still count and took time
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started") and exception_context.statement is not None:
+            _record_statement(conn, exception_context.statement)
+
+
+def _record_statement(conn, statement: str):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    db_queries.inc()
+    db_seconds.inc(amount=elapsed)
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+        if len(stats.statements) < MAX_RECORDED_STATEMENTS:
+            stats.statements.append(statement)
+
+
+def _route_path(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streaming responses and WebSockets pass through untouched."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "websocket":
+            await self._websocket(scope, receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+    async def _http(self, scope, receive, send):
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request.reset(token)
+            self._record(scope["method"], _route_path(scope), status, time.perf_counter() - started, stats)
+
+    def _record(self, method: str, route: str, status: int, elapsed: float, stats: RequestStats):
+        http_requests.inc(method, route, status)
+        http_latency.observe(elapsed, method, route)
+        db_queries_per_request.observe(stats.queries, method, route)
+        db_time_per_request.observe(stats.db_time, method, route)
+
+        repeated, times = (StatementCounter(stats.statements).most_common(1) or [(None, 0)])[0]
+        if times >= settings.REPEATED_QUERY_THRESHOLD:
+            repeated_query_requests.inc(method, route)
+            print(f"Repeated query in {method} {route}: {times}x {' '.join(repeated.split())[:200]}")
+
+        if elapsed >= settings.SLOW_REQUEST_SECONDS:
+            slow_requests.inc(method, route)
+            print(
+                f"Slow request {method} {route} -> {status} in {elapsed * 1000:.0f} ms "
+                f"({stats.queries} queries, {stats.db_time * 1000:.0f} ms in DB)"
+            )
+            for statement in stats.statements:
+                print(f"    {' '.join(statement.split())[:500]}")
+            if stats.queries > len(stats.statements):
+                print(f"    ... {stats.queries - len(stats.statements)} more")
+
+    async def _websocket(self, scope, receive, send):
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "websocket.receive":
+                websocket_frames.inc("in")
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "websocket.send":
+                websocket_frames.inc("out")
+            elif message["type"] == "websocket.accept":
+                websocket_sessions.inc(_route_path(scope))
+            await send(message)
+
+        await self.app(scope, receive_wrapper, send_wrapper)
+
+
+def render(extra: Optional[Callable[[], List[str]]] = None) -> str:
+    lines: List[str] = []
+    for metric in (http_requests, http_latency, db_queries_per_request, db_time_per_request, db_queries,
+                   db_seconds, slow_requests, repeated_query_requests, websocket_frames, websocket_sessions):
+        lines.extend(metric.render())
+    if extra is not None:
+        lines.extend(extra())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,118 @@
+import asyncio
+from typing import Dict, List, Optional, Set
+
+
+class PresenceTracker:
+    """Subscription-scoped presence built on top of ConnectionManager.
+
+    Each watcher subscribes to the users it cares about. Online/offline changes
+    are collected for `window` seconds and then sent to every affected watcher
+    as a single {"type": "presence", "online": [...], "offline": [...]} diff.
+    Users that flap back to the state a watcher already knows are left out, so
+    a reconnect storm costs at most one frame per watcher per window.
+
+    Ids come from clients, so each frame carries at most `max_ids_per_frame`
+    of them and a watcher follows at most `max_subscriptions` users; requests
+    beyond that, or ids that are not integers, raise ValueError.
+    """
+
+    def __init__(self, manager, window: float = 0.5, max_ids_per_frame: int = 200, max_subscriptions: int = 1000):
+        self.manager = manager
+        self.window = window
+        self.max_ids_per_frame = max_ids_per_frame
+        self.max_subscriptions = max_subscriptions
+        self.subscriptions: Dict[int, Set[int]] = {}
+        self.watchers: Dict[int, Set[int]] = {}
+        self.known: Dict[int, Dict[int, bool]] = {}
+        self.changed: Set[int] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        manager.presence_listeners.append(self.user_changed)
+
+    def parse_user_ids(self, user_ids) -> List[int]:
+        """Validate a client-supplied list of user ids, accepting numeric strings."""
+        if not isinstance(user_ids, list):
+            raise ValueError("'user_ids' must be a list")
+        if len(user_ids) > self.max_ids_per_frame:
+            raise ValueError(f"At most {self.max_ids_per_frame} user ids per frame")
+        parsed = []
+        for user_id in user_ids:
+            if isinstance(user_id, bool) or not isinstance(user_id, (int, str)):
+                raise ValueError(f"Invalid user id: {user_id!r}")
+            try:
+                parsed.append(int(user_id))
+            except ValueError:
+                raise ValueError(f"Invalid user id: {user_id!r}")
+        return parsed
+
+    def subscribe(self, watcher_id: int, user_ids) -> Optional[dict]:
+        """Watch user_ids; returns a snapshot diff for the newly watched users."""
+        subscribed = self.subscriptions.get(watcher_id, set())
+        new_ids = [
+            user_id for user_id in dict.fromkeys(self.parse_user_ids(user_ids))
+            if user_id not in subscribed and user_id != watcher_id
+        ]
+        if len(subscribed) + len(new_ids) > self.max_subscriptions:
+            raise ValueError(f"At most {self.max_subscriptions} presence subscriptions")
+        if not new_ids:
+            return None
+
+        subscribed = self.subscriptions.setdefault(watcher_id, subscribed)
+        known = self.known.setdefault(watcher_id, {})
+        snapshot = {"type": "presence", "online": [], "offline": []}
+
+        for user_id in new_ids:
+            subscribed.add(user_id)
+            self.watchers.setdefault(user_id, set()).add(watcher_id)
+            online = self.manager.is_online(user_id)
+            known[user_id] = online
+            snapshot["online" if online else "offline"].append(user_id)
+        return snapshot
+
+    def unsubscribe(self, watcher_id: int, user_ids):
+        subscribed = self.subscriptions.get(watcher_id, set())
+        known = self.known.get(watcher_id, {})
+        for user_id in self.parse_user_ids(user_ids):
+            subscribed.discard(user_id)
+            known.pop(user_id, None)
+            self._unwatch(watcher_id, user_id)
+
+    def unsubscribe_all(self, watcher_id: int):
+        for user_id in self.subscriptions.pop(watcher_id, ()):
+            self._unwatch(watcher_id, user_id)
+        self.known.pop(watcher_id, None)
+
+    def _unwatch(self, watcher_id: int, user_id: int):
+        watchers = self.watchers.get(user_id)
+        if watchers is not None:
+            watchers.discard(watcher_id)
+            if not watchers:
+                del self.watchers[user_id]
+
+    def user_changed(self, user_id: int):
+        if user_id not in self.watchers:
+            return
+        self.changed.add(user_id)
+        if self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        self._flush_task = None
+        await self.flush()
+
+    async def flush(self):
+        changed, self.changed = self.changed, set()
+        diffs: Dict[int, dict] = {}
+
+        for user_id in changed:
+            online = self.manager.is_online(user_id)
+            for watcher_id in self.watchers.get(user_id, ()):
+                known = self.known[watcher_id]
+                if known.get(user_id) == online:
+                    continue  # Flapped back to what the watcher already knows
+                known[user_id] = online
+                diff = diffs.setdefault(watcher_id, {"type": "presence", "online": [], "offline": []})
+                diff["online" if online else "offline"].append(user_id)
+
+        for watcher_id, diff in diffs.items():
+            await self.manager.send_personal_message(diff, watcher_id)
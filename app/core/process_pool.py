@@ -0,0 +1,17 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+def spawn_pool(workers: int) -> ProcessPoolExecutor:
+    """Process pool for CPU-bound work (bcrypt, audio analysis).
+
+    Workers are spawned, not forked: forking a process that runs an event loop
+    and DB threads is unsafe. They import their target function's module
+    afresh, so scripts that use these pools need an `if __name__ == "__main__"` guard.
+    """
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def discard_pool(pool: ProcessPoolExecutor):
+    """Shut down a pool without waiting, cancelling whatever is still queued."""
+    pool.shutdown(wait=False, cancel_futures=True)
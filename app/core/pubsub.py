@@ -0,0 +1,219 @@
+import asyncio
+import fcntl
+import json
+import os
+from typing import Awaitable, Callable, Dict, List, Optional
+
+Handler = Callable[[dict], Awaitable[None]]
+
+
+class PubSubBackend:
+    """Channel shared by every ConnectionManager that should see the same users.
+
+    Messages are plain JSON-serializable dicts; every subscriber receives every
+    published message, including its own, and is expected to filter by origin.
+    Each time a subscriber is (re)attached it receives {"type": "connected"},
+    after which its own publishes are guaranteed to reach every other subscriber.
+    """
+
+    async def start(self, handler: Handler):
+        raise NotImplementedError
+
+    async def publish(self, message: dict):
+        raise NotImplementedError
+
+    async def stop(self):
+        pass
+
+
+class InProcessPubSub(PubSubBackend):
+    """Delivers messages to subscribers living in the same process.
+
+    Pass the same `subscribers` list to several instances to connect managers
+    running side by side (e.g. in tests).
+    """
+
+    def __init__(self, subscribers: Optional[List[Handler]] = None):
+        self.subscribers = subscribers if subscribers is not None else []
+        self.handler: Optional[Handler] = None
+
+    async def start(self, handler: Handler):
+        self.handler = handler
+        self.subscribers.append(handler)
+        await handler({"type": "connected"})
+
+    async def publish(self, message: dict):
+        for handler in list(self.subscribers):
+            await handler(message)
+
+    async def stop(self):
+        if self.handler in self.subscribers:
+            self.subscribers.remove(self.handler)
+        self.handler = None
+
+
+class _BrokerPeer:
+    """A worker connected to the broker, with its own bounded outbound queue and writer task."""
+
+    def __init__(self, writer: asyncio.StreamWriter, queue_size: int):
+        self.writer = writer
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.task: Optional[asyncio.Task] = None
+
+    async def write_loop(self):
+        try:
+            while True:
+                line = await self.queue.get()
+                self.writer.write(line)
+                await self.writer.drain()
+        except ConnectionError:
+            self.writer.close()
+
+    def close(self):
+        if self.task is not None and self.task is not asyncio.current_task():
+            self.task.cancel()
+        self.writer.close()
+
+
+class UnixSocketPubSub(PubSubBackend):
+    """Relays messages between workers on one host through a Unix socket broker.
+
+    The first worker to start binds the socket and runs the broker in its
+    event loop; every worker (including that one) connects to it as a client.
+    Messages are newline-delimited JSON. If the broker goes away, clients elect
+    a new one and reconnect.
+
+    The broker writes to each worker from that worker's own queue, so a stalled
+    worker never holds up the others. A worker that falls `peer_queue_size`
+    messages behind is disconnected; it reconnects and resyncs like after a
+    broker change.
+    """
+
+    def __init__(self, path: str, reconnect_delay: float = 0.1, peer_queue_size: int = 10000):
+        self.path = path
+        self.reconnect_delay = reconnect_delay
+        self.peer_queue_size = peer_queue_size
+        self.handler: Optional[Handler] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._peers: Dict[asyncio.StreamWriter, _BrokerPeer] = {}
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._read_task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    async def start(self, handler: Handler):
+        self.handler = handler
+        self._stopping = False
+        await self._connect()
+        self._read_task = asyncio.create_task(self._read_loop())
+
+    async def publish(self, message: dict):
+        if self._writer is None:
+            return
+        try:
+            self._writer.write(json.dumps(message).encode() + b"\n")
+            await self._writer.drain()
+        except (ConnectionError, RuntimeError) as e:
+            print(f"Could not publish to broker at {self.path}: {e}")
+
+    async def stop(self):
+        self._stopping = True
+        if self._read_task is not None:
+            self._read_task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+        if self._server is not None:
+            self._server.close()
+            for peer in list(self._peers.values()):
+                peer.close()
+            self._peers.clear()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self._server = None
+
+    async def _connect(self):
+        await self._ensure_broker()
+        self._reader, self._writer = await asyncio.open_unix_connection(self.path)
+
+    async def _ensure_broker(self):
+        # Serialize the election so two workers never bind the same path
+        with open(f"{self.path}.lock", "w") as lock_file:
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    await asyncio.sleep(0.01)
+            try:
+                try:
+                    _, writer = await asyncio.open_unix_connection(self.path)
+                    writer.close()
+                    return
+                except (FileNotFoundError, ConnectionRefusedError):
+                    pass
+
+                if os.path.exists(self.path):
+                    os.unlink(self.path)  # Stale socket left by a dead broker
+                self._server = await asyncio.start_unix_server(self._serve_peer, path=self.path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    async def _read_loop(self):
+        while not self._stopping:
+            try:
+                line = await self._reader.readline()
+            except ConnectionError:
+                line = b""
+            if not line:
+                # Broker went away: elect a new one; its welcome triggers a resync
+                await asyncio.sleep(self.reconnect_delay)
+                try:
+                    await self._connect()
+                except OSError as e:
+                    print(f"Reconnecting to broker at {self.path} failed: {e}")
+                continue
+            try:
+                await self.handler(json.loads(line))
+            except Exception as e:
+                print(f"Error handling broker message: {e}")
+
+    async def _serve_peer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        if self._stopping:
+            writer.close()
+            return
+        peer = _BrokerPeer(writer, self.peer_queue_size)
+        peer.task = asyncio.create_task(peer.write_loop())
+        self._peers[writer] = peer
+        origin = None
+        try:
+            # Only welcome the peer once it is registered, so nothing it publishes
+            # in response can be missed by the others
+            self._send(peer, json.dumps({"type": "connected"}).encode() + b"\n")
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if origin is None:
+                    origin = json.loads(line).get("origin")
+                self._relay(line)
+        except ConnectionError:
+            pass
+        finally:
+            self._drop_peer(peer)
+            if origin is not None and not self._stopping:
+                self._relay(json.dumps({"type": "node_down", "origin": origin}).encode() + b"\n")
+
+    def _relay(self, line: bytes):
+        for peer in list(self._peers.values()):
+            self._send(peer, line)
+
+    def _send(self, peer: _BrokerPeer, line: bytes):
+        try:
+            peer.queue.put_nowait(line)
+        except asyncio.QueueFull:
+            print(f"Dropping broker peer {self.peer_queue_size} messages behind")
+            self._drop_peer(peer)
+
+    def _drop_peer(self, peer: _BrokerPeer):
+        self._peers.pop(peer.writer, None)
+        peer.close()
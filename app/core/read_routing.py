@@ -0,0 +1,76 @@
+"""Read-your-writes for endpoints that read from the replica.
+
+A successful write (any non-GET/HEAD/OPTIONS request answered below 400)
+pins that client to the primary for READ_YOUR_WRITES_SECONDS, so the change it
+just made is visible even if the replica lags behind. The pin is a timestamp
+sent back as a cookie and as a response header. Browsers return the cookie by
+themselves; API clients that do not keep cookies can echo the header instead.
+Either way the pin holds across workers.
+
+Chat writes made over a WebSocket have no HTTP response to carry the pin, so
+the worker holding the socket pins the users involved instead (pin_users).
+That pin lives in the worker's memory, so it only routes the reads this
+worker serves; reads that land on another worker see the replica as usual.
+"""
+import time
+from typing import Dict
+from fastapi import Request
+from app.core.config import settings
+
+PIN_COOKIE = "read_primary_until"
+PIN_HEADER = "x-read-primary-until"
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+MAX_USER_PINS = 10000  # Expired pins are dropped once there are more than this
+
+_user_pins: Dict[int, float] = {}  # user id -> pinned until (epoch seconds)
+
+
+def pinned_to_primary(request: Request) -> bool:
+    value = request.headers.get(PIN_HEADER) or request.cookies.get(PIN_COOKIE)
+    if not value:
+        return False
+    try:
+        return float(value) > time.time()
+    except ValueError:
+        return False
+
+
+def pin_users(*user_ids: int):
+    """Send these users' reads to the primary for the next READ_YOUR_WRITES_SECONDS."""
+    now = time.time()
+    until = now + settings.READ_YOUR_WRITES_SECONDS
+    for user_id in user_ids:
+        _user_pins[int(user_id)] = until
+    if len(_user_pins) > MAX_USER_PINS:
+        for user_id, pinned_until in list(_user_pins.items()):
+            if pinned_until <= now:
+                del _user_pins[user_id]
+
+
+def user_pinned(user_id: int) -> bool:
+    return _user_pins.get(user_id, 0) > time.time()
+
+
+class ReadYourWritesMiddleware:
+    """Pure ASGI middleware that pins writing clients to the primary."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in READ_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                window = settings.READ_YOUR_WRITES_SECONDS
+                until = f"{time.time() + window:.3f}"
+                cookie = f"{PIN_COOKIE}={until}; Max-Age={int(window) + 1}; Path=/; HttpOnly; SameSite=Lax"
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"set-cookie", cookie.encode()),
+                    (PIN_HEADER.encode(), until.encode()),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,302 @@
+import asyncio
+import threading
+import time
+from typing import Optional, Set, Tuple
+import numpy as np
+from sqlalchemy import select
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models.like import Like
+
+# Likes are kept as one sorted int64 array of (user_id << 32 | track_id) keys
+_SHIFT = 32
+_TRACK_MASK = (1 << _SHIFT) - 1
+
+
+def _like_key(user_id: int, track_id: int) -> int:
+    return (user_id << _SHIFT) | track_id
+
+
+def _unique(values: np.ndarray) -> np.ndarray:
+    # Sort-based; much faster than np.unique's default on large int arrays in recent NumPy
+    values = np.sort(values)
+    if len(values) == 0:
+        return values
+    return values[np.concatenate(([True], values[1:] != values[:-1]))]
+
+
+def _expand(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Concatenate arange(start, start + length) for every (start, length) pair."""
+    lengths = lengths.astype(np.int64)
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(int(lengths.sum()), dtype=np.int64)
+
+
+class NeighborIndex:
+    """Top-k similar tracks per track, stored CSR-style.
+
+    Row i belongs to track_ids[i]; its neighbours are
+    neighbor_ids[indptr[i]:indptr[i + 1]] with matching scores, best first.
+    """
+
+    def __init__(self, track_ids: np.ndarray, indptr: np.ndarray, neighbor_ids: np.ndarray, scores: np.ndarray):
+        self.track_ids = track_ids
+        self.indptr = indptr
+        self.neighbor_ids = neighbor_ids
+        self.scores = scores
+
+    @classmethod
+    def from_rows(cls, rows: np.ndarray, neighbor_ids: np.ndarray, scores: np.ndarray) -> "NeighborIndex":
+        # rows must already be grouped (sorted) by track id
+        track_ids, counts = np.unique(rows, return_counts=True)
+        indptr = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        return cls(track_ids, indptr, neighbor_ids, scores.astype(np.float32))
+
+    def rows(self) -> np.ndarray:
+        return np.repeat(self.track_ids, np.diff(self.indptr))
+
+    def neighbors(self, track_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(source position, neighbour id, score) for every neighbour of the given tracks."""
+        if len(self.track_ids) == 0:
+            return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.float32)
+        pos = np.minimum(np.searchsorted(self.track_ids, track_ids), len(self.track_ids) - 1)
+        hit = self.track_ids[pos] == track_ids
+        source = np.flatnonzero(hit)
+        starts = self.indptr[pos[hit]]
+        lengths = self.indptr[pos[hit] + 1] - starts
+        at = _expand(starts, lengths)
+        return np.repeat(source, lengths), self.neighbor_ids[at], self.scores[at]
+
+    def replace_rows(self, replaced: np.ndarray, other: "NeighborIndex") -> "NeighborIndex":
+        """A new index with every row in `replaced` taken from `other`."""
+        rows = self.rows()
+        keep = ~np.isin(rows, replaced)
+        rows = np.concatenate((rows[keep], other.rows()))
+        neighbor_ids = np.concatenate((self.neighbor_ids[keep], other.neighbor_ids))
+        scores = np.concatenate((self.scores[keep], other.scores))
+        order = np.argsort(rows, kind="stable")  # Each row's neighbours stay best-first
+        return NeighborIndex.from_rows(rows[order], neighbor_ids[order], scores[order])
+
+    @property
+    def nbytes(self) -> int:
+        return self.track_ids.nbytes + self.indptr.nbytes + self.neighbor_ids.nbytes + self.scores.nbytes
+
+
+def build_neighbors(
+    user_ids: np.ndarray,
+    track_ids: np.ndarray,
+    k: int = 50,
+    max_user_likes: int = 500,
+    targets: Optional[np.ndarray] = None,
+    pair_budget: int = 5_000_000,
+) -> NeighborIndex:
+    """Item-item cosine similarity over (user, track) likes, keeping the top k per track.
+
+    similarity(i, j) = co_likes(i, j) / sqrt(likes(i) * likes(j)). Co-occurrences
+    are counted by expanding track -> users -> tracks through CSR arrays, a block
+    of target tracks at a time so at most ~pair_budget pairs are in memory.
+    Users with more than max_user_likes likes contribute an evenly spaced
+    sample of them, which keeps the pair count linear in the number of likes.
+    Only rows for `targets` (track ids) are computed when it is given.
+    """
+    users, u = np.unique(user_ids, return_inverse=True)
+    tracks, t = np.unique(track_ids, return_inverse=True)
+    n_tracks = len(tracks)
+    empty = NeighborIndex(np.empty(0, np.int64), np.zeros(1, np.int64), np.empty(0, np.int64), np.empty(0, np.float32))
+    if n_tracks == 0:
+        return empty
+
+    # User -> tracks (CSR)
+    if not np.all((u[1:] > u[:-1]) | ((u[1:] == u[:-1]) & (t[1:] >= t[:-1]))):
+        order = np.lexsort((t, u))  # Like keys arrive already sorted; other callers may not
+        u, t = u[order], t[order]
+    user_deg = np.bincount(u, minlength=len(users))
+    if max_user_likes and user_deg.max() > max_user_likes:
+        user_ptr = np.concatenate(([0], np.cumsum(user_deg)))
+        rank = np.arange(len(u)) - user_ptr[u]
+        step = -(-user_deg // max_user_likes)  # ceil division
+        keep = rank % step[u] == 0
+        u, t = u[keep], t[keep]
+        user_deg = np.bincount(u, minlength=len(users))
+    user_ptr = np.concatenate(([0], np.cumsum(user_deg))).astype(np.int64)
+    user_tracks = t
+
+    # Track -> users (CSC)
+    order = np.argsort(t, kind="stable")
+    track_users = u[order]
+    track_deg = np.bincount(t, minlength=n_tracks)
+    track_ptr = np.concatenate(([0], np.cumsum(track_deg))).astype(np.int64)
+
+    if targets is None:
+        target_idx = np.arange(n_tracks)
+    else:
+        target_idx = np.flatnonzero(np.isin(tracks, targets))
+    if len(target_idx) == 0:
+        return empty
+
+    # Pairs generated for a target = sum of the like counts of its users
+    cost = np.bincount(t, weights=user_deg[u], minlength=n_tracks)[target_idx]
+    block_of = (np.cumsum(cost) // pair_budget).astype(np.int64)
+    blocks = np.split(target_idx, np.flatnonzero(np.diff(block_of)) + 1)
+
+    rows, neighbors, scores = [], [], []
+    for block in blocks:
+        lengths = track_deg[block]
+        row = np.repeat(np.arange(len(block)), lengths)
+        likers = track_users[_expand(track_ptr[block], lengths)]
+
+        lengths = user_deg[likers]
+        row = np.repeat(row, lengths)
+        other = user_tracks[_expand(user_ptr[likers], lengths)]
+        mask = other != block[row]
+
+        pair_keys, co = np.unique(row[mask].astype(np.int64) * n_tracks + other[mask], return_counts=True)
+        r, j = pair_keys // n_tracks, pair_keys % n_tracks
+        score = co / np.sqrt(track_deg[block[r]].astype(np.float64) * track_deg[j])
+
+        # Best k per row: sort by (row, -score) and keep each row's first k
+        order = np.lexsort((-score, r))
+        r, j, score = r[order], j[order], score[order]
+        rank = np.arange(len(r)) - np.searchsorted(r, r)
+        keep = rank < k
+        rows.append(tracks[block[r[keep]]])
+        neighbors.append(tracks[j[keep]])
+        scores.append(score[keep])
+
+    return NeighborIndex.from_rows(np.concatenate(rows), np.concatenate(neighbors), np.concatenate(scores))
+
+
+class Recommender:
+    """Serves "listeners also liked" and per-user recommendations from memory.
+
+    A full rebuild loads every like and recomputes all rows. In between, like
+    and unlike events are buffered; each refresh merges them into the like
+    array and recomputes only the rows of the tracks that were liked or
+    unliked. Events from other workers arrive over the connection manager's
+    pub/sub ("like_events"), so every worker sees a like within one refresh.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        k: int = 50,
+        max_user_likes: int = 500,
+        refresh_interval: float = 30.0,
+        rebuild_interval: float = 3600.0,
+    ):
+        self.session_factory = session_factory
+        self.k = k
+        self.max_user_likes = max_user_likes
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.index: Optional[NeighborIndex] = None
+        self.built_at: Optional[float] = None
+        self._likes = np.empty(0, np.int64)
+        self._added: Set[int] = set()
+        self._removed: Set[int] = set()
+        self._lock = threading.Lock()  # Like endpoints record events from threadpool threads
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def record_like(self, user_id: int, track_id: int):
+        key = _like_key(user_id, track_id)
+        with self._lock:
+            self._removed.discard(key)
+            self._added.add(key)
+
+    def record_unlike(self, user_id: int, track_id: int):
+        key = _like_key(user_id, track_id)
+        with self._lock:
+            self._added.discard(key)
+            self._removed.add(key)
+
+    def rebuild(self):
+        with self.session_factory() as db:
+            result = db.execute(select(Like.user_id, Like.track_id).execution_options(stream_results=True))
+            chunks = [np.array(chunk, dtype=np.int64).reshape(-1, 2) for chunk in result.partitions(100_000)]
+        pairs = np.concatenate(chunks) if chunks else np.empty((0, 2), np.int64)
+        likes = _unique((pairs[:, 0] << _SHIFT) | pairs[:, 1])
+
+        # Events seen while loading may or may not be in the snapshot; replaying them is idempotent
+        likes, _ = self._apply_pending(likes)
+        self.index = build_neighbors(likes >> _SHIFT, likes & _TRACK_MASK, self.k, self.max_user_likes)
+        self._likes = likes
+        self.built_at = time.monotonic()
+
+    def refresh(self):
+        if self.index is None:
+            return
+        likes, changed = self._apply_pending(self._likes)
+        if len(changed) == 0:
+            return
+
+        # Recompute the rows of the liked/unliked tracks. Their co-liked tracks see
+        # the change in their own rows at the next full rebuild; recomputing those
+        # too would touch nearly every popular track after a handful of likes.
+        dirty = _unique(changed & _TRACK_MASK)
+        updated = build_neighbors(likes >> _SHIFT, likes & _TRACK_MASK, self.k, self.max_user_likes, targets=dirty)
+        self.index = self.index.replace_rows(dirty, updated)
+        self._likes = likes
+
+    def _apply_pending(self, likes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        with self._lock:
+            added = np.fromiter(self._added, np.int64, len(self._added))
+            removed = np.fromiter(self._removed, np.int64, len(self._removed))
+            self._added, self._removed = set(), set()
+        likes = _unique(np.concatenate((likes, added)))
+        likes = likes[~np.isin(likes, removed)]
+        return likes, np.concatenate((added, removed))
+
+    def similar(self, track_id: int, limit: int) -> Tuple[np.ndarray, np.ndarray]:
+        _, neighbor_ids, scores = self.index.neighbors(np.array([track_id], np.int64))
+        return neighbor_ids[:limit], scores[:limit]
+
+    def recommend(self, user_id: int, limit: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Sum of similarity to the user's liked tracks, excluding tracks already liked."""
+        likes = self._likes
+        start, end = np.searchsorted(likes, [user_id << _SHIFT, (user_id + 1) << _SHIFT])
+        liked = likes[start:end] & _TRACK_MASK
+        with self._lock:
+            pending = [k for k in self._added if k >> _SHIFT == user_id]
+            dropped = [k & _TRACK_MASK for k in self._removed if k >> _SHIFT == user_id]
+        liked = np.setdiff1d(np.union1d(liked, np.array(pending, np.int64) & _TRACK_MASK), dropped)
+        if len(liked) == 0:
+            return np.empty(0, np.int64), np.empty(0, np.float32)
+
+        _, candidates, scores = self.index.neighbors(liked[-self.max_user_likes:])
+        candidates, slot = np.unique(candidates, return_inverse=True)
+        totals = np.bincount(slot, weights=scores, minlength=len(candidates))
+        totals[np.isin(candidates, liked)] = 0
+        best = np.argsort(-totals, kind="stable")[:limit]
+        best = best[totals[best] > 0]
+        return candidates[best], totals[best].astype(np.float32)
+
+    async def _run(self):
+        while True:
+            try:
+                if self.built_at is None or time.monotonic() - self.built_at > self.rebuild_interval:
+                    await asyncio.to_thread(self.rebuild)
+                else:
+                    await asyncio.to_thread(self.refresh)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Recommendation index refresh failed: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+
+recommender = Recommender(
+    SessionLocal,
+    k=settings.RECOMMENDER_TOP_K,
+    max_user_likes=settings.RECOMMENDER_MAX_USER_LIKES,
+    refresh_interval=settings.RECOMMENDER_REFRESH_INTERVAL,
+    rebuild_interval=settings.RECOMMENDER_REBUILD_INTERVAL,
+)
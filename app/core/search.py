@@ -0,0 +1,122 @@
+import re
+from typing import List
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import Base
+
+# Inverted index over tracks(title, artist, album).
+# SQLite: an external-content FTS5 table kept in sync by triggers.
+# Postgres: a weighted, generated tsvector column with a GIN index.
+
+SQLITE_FTS_TABLE = """
+    CREATE VIRTUAL TABLE tracks_fts USING fts5(
+        title, artist, album,
+        content='tracks', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+"""
+
+SQLITE_FTS_TRIGGERS = {
+    "tracks_fts_ai": """
+    CREATE TRIGGER tracks_fts_ai AFTER INSERT ON tracks BEGIN
+        INSERT INTO tracks_fts(rowid, title, artist, album) VALUES (new.id, new.title, new.artist, new.album);
+    END
+    """,
+    "tracks_fts_ad": """
+    CREATE TRIGGER tracks_fts_ad AFTER DELETE ON tracks BEGIN
+        INSERT INTO tracks_fts(tracks_fts, rowid, title, artist, album) VALUES ('delete', old.id, old.title, old.artist, old.album);
+    END
+    """,
+    "tracks_fts_au": """
+    CREATE TRIGGER tracks_fts_au AFTER UPDATE OF title, artist, album ON tracks BEGIN
+        INSERT INTO tracks_fts(tracks_fts, rowid, title, artist, album) VALUES ('delete', old.id, old.title, old.artist, old.album);
+        INSERT INTO tracks_fts(rowid, title, artist, album) VALUES (new.id, new.title, new.artist, new.album);
+    END
+    """,
+}
+
+# Reindex from tracks; needed whenever rows may have changed without the triggers in place
+SQLITE_FTS_REBUILD = "INSERT INTO tracks_fts(tracks_fts) VALUES ('rebuild')"
+
+POSTGRES_SEARCH_DDL = [
+    """
+    ALTER TABLE tracks ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(artist, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(album, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_tracks_search_vector ON tracks USING GIN (search_vector)",
+]
+
+SQLITE_SEARCH_QUERY = text("""
+    SELECT tracks.id, tracks.title, tracks.artist, tracks.album, tracks.duration, tracks.file_url
+    FROM tracks_fts JOIN tracks ON tracks.id = tracks_fts.rowid
+    WHERE tracks_fts MATCH :query
+    ORDER BY bm25(tracks_fts, 10.0, 5.0, 1.0)
+    LIMIT :limit
+""")
+
+POSTGRES_SEARCH_QUERY = text("""
+    SELECT id, title, artist, album, duration, file_url
+    FROM tracks
+    WHERE search_vector @@ to_tsquery('simple', :query)
+    ORDER BY ts_rank(search_vector, to_tsquery('simple', :query)) DESC, id
+    LIMIT :limit
+""")
+
+
+@event.listens_for(Base.metadata, "after_create")
+def create_search_index(target, connection, **kw):
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        _create_sqlite_search_index(connection)
+    elif dialect == "postgresql":
+        for statement in POSTGRES_SEARCH_DDL:
+            connection.execute(text(statement))
+
+
+def _create_sqlite_search_index(connection):
+    """Create whichever of the FTS table and its triggers are missing.
+
+    Triggers are dropped together with tracks, so a recreated tracks table
+    leaves tracks_fts in place but out of sync. Creating the table or any
+    trigger therefore reindexes everything.
+    """
+    existing = {
+        name for (name,) in connection.execute(text(
+            "SELECT name FROM sqlite_master WHERE (type = 'table' AND name = 'tracks_fts') "
+            "OR (type = 'trigger' AND tbl_name = 'tracks')"
+        ))
+    }
+    statements = [] if "tracks_fts" in existing else [SQLITE_FTS_TABLE]
+    statements += [ddl for name, ddl in SQLITE_FTS_TRIGGERS.items() if name not in existing]
+    if not statements:
+        return
+    for statement in statements:
+        connection.execute(text(statement))
+    connection.execute(text(SQLITE_FTS_REBUILD))
+
+
+def _terms(query: str) -> List[str]:
+    return re.findall(r"\w+", query.lower())
+
+
+def build_match_query(query: str, dialect: str) -> str:
+    """Turn free text into a prefix query: every term must match a word prefix."""
+    terms = _terms(query)
+    if dialect == "postgresql":
+        return " & ".join(f"{term}:*" for term in terms)
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+async def search_tracks(db: AsyncSession, query: str, limit: int = 20) -> List[dict]:
+    dialect = db.get_bind().dialect.name
+    match = build_match_query(query, dialect)
+    if not match:
+        return []
+
+    statement = POSTGRES_SEARCH_QUERY if dialect == "postgresql" else SQLITE_SEARCH_QUERY
+    result = await db.execute(statement, {"query": match, "limit": limit})
+    return [dict(row) for row in result.mappings().all()]
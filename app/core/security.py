@@ -1,29 +1,25 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
+from uuid import uuid4
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
-from app.database import get_db
 from app.core.config import settings
+from app.core.hashing import PasswordHasher
+from app.core.token_cache import RevocationList, TokenCache
 from app.schemas.auth import TokenData  # assuming TokenData is in app/schemas
 
-pwd_cxt = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Async bcrypt for request handlers; runs in its own process pool
+password_hasher = PasswordHasher(
+    rounds=settings.BCRYPT_ROUNDS,
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-
-# Password hashing utility
-class Hash():
-    @staticmethod
-    def bcrypt(password: str):
-        """Hash a password using bcrypt."""
-        return pwd_cxt.hash(password)
-
-    @staticmethod
-    def verify(plain_password: str, hashed_password: str):
-        """Verify a password against a hashed password."""
-        return pwd_cxt.verify(plain_password, hashed_password)
+# Verified claims of recently seen tokens, and tokens revoked before they expire
+token_cache = TokenCache(max_entries=settings.AUTH_TOKEN_CACHE_SIZE)
+revoked_tokens = RevocationList()
 
 
 # Create JWT token
@@ -33,16 +29,32 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
         expire = datetime.now(timezone.utc) + expires_delta
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid4().hex})
 
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 
+def token_id(payload: dict, token: str) -> str:
+    # Tokens issued before jti was added are identified by their raw value
+    return payload.get("jti") or token
+
+
+# Decode a JWT token, skipping signature verification for tokens verified before
+def decode_token(token: str) -> dict:
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        token_cache.put(token, payload)
+    if revoked_tokens.is_revoked(token_id(payload, token)):
+        raise JWTError("Token has been revoked")
+    return payload
+
+
 # Verify JWT token
 def verify_token(token: str, credentials_exception):
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = decode_token(token)
         user_id = payload.get("sub")
         email = payload.get("email")
         if user_id is None or email is None:
@@ -53,8 +65,8 @@ def verify_token(token: str, credentials_exception):
         raise credentials_exception
 
 
-# Get the currently authenticated user via token
-def get_current_user(data: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+# Get the currently authenticated user via token (no DB access needed: claims come from the token)
+async def get_current_user(data: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -63,14 +75,14 @@ def get_current_user(data: str = Depends(oauth2_scheme), db: Session = Depends(g
     return verify_token(data, credentials_exception)
 
 
-def get_current_admin_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_admin_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=401,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = decode_token(token)
         email = payload.get("sub")
         role = payload.get("role")
         if email is None or role is None:
@@ -0,0 +1,110 @@
+"""Startup warmup and readiness.
+
+The lifespan starts warmup() in the background so the worker accepts
+connections straight away; /ready answers 503 until every check has passed,
+which keeps a load balancer from routing traffic to a worker whose pools are
+still cold during a rolling restart.
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Optional
+from sqlalchemy import select, text
+from app.core.config import settings
+from app.core.leaderboard import top_tracks
+from app.core.security import password_hasher
+from app.database import AsyncSessionLocal, async_engine, async_read_engine, engine, read_engine
+from app.models.track import Track
+
+# Seconds between attempts when a warmup step fails (e.g. the database is not up yet)
+RETRY_INTERVAL = 1.0
+
+
+class Readiness:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.checks: Dict[str, str] = {}  # name -> "pending", "ok" or "error: ..."
+        self.warm_after: Optional[float] = None
+        self.stopping = False
+
+    @property
+    def ready(self) -> bool:
+        return not self.stopping and bool(self.checks) and all(v == "ok" for v in self.checks.values())
+
+    def pending(self, name: str):
+        self.checks[name] = "pending"
+
+    def passed(self, name: str):
+        self.checks[name] = "ok"
+        if self.ready and self.warm_after is None:
+            self.warm_after = time.monotonic() - self.started
+
+    def failed(self, name: str, error: Exception):
+        self.checks[name] = f"error: {error}"
+
+    def report(self) -> dict:
+        return {
+            "ready": self.ready,
+            "stopping": self.stopping,
+            "checks": dict(self.checks),
+            "warmup_seconds": round(self.warm_after, 3) if self.warm_after is not None else None,
+        }
+
+
+readiness = Readiness()
+
+
+def _open_sync_connections(target, count: int):
+    # Hold them all at once so the pool really ends up with `count` connections
+    connections = [target.connect() for _ in range(count)]
+    try:
+        for connection in connections:
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+async def _open_async_connection(target):
+    async with target.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+
+async def warm_database():
+    count = max(settings.WARMUP_DB_CONNECTIONS, 1)
+    sync_engines = {engine, read_engine}
+    async_engines = {async_engine, async_read_engine}
+    await asyncio.gather(
+        *(asyncio.to_thread(_open_sync_connections, e, count) for e in sync_engines),
+        *(_open_async_connection(e) for e in async_engines for _ in range(count)),
+    )
+
+
+async def warm_top_tracks():
+    async with AsyncSessionLocal() as db:
+        counts = (await db.execute(select(Track.id, Track.like_count).where(Track.like_count > 0))).all()
+    top_tracks.load(counts)
+
+
+async def _run_step(name: str, step: Callable[[], Awaitable[None]]):
+    while True:
+        try:
+            await step()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            readiness.failed(name, e)
+            print(f"Warmup step {name} failed, retrying: {e}")
+            await asyncio.sleep(RETRY_INTERVAL)
+        else:
+            readiness.passed(name)
+            return
+
+
+async def warmup():
+    steps = {"database": warm_database, "top_tracks": warm_top_tracks}
+    if settings.WARMUP_PASSWORD_HASHER:
+        steps["password_hasher"] = password_hasher.warmup
+    for name in steps:
+        readiness.pending(name)
+    await asyncio.gather(*(_run_step(name, step) for name, step in steps.items()))
+    print(f"Warmup finished in {readiness.warm_after or 0:.2f}s")
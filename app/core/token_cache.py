@@ -0,0 +1,73 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class TokenCache:
+    """Bounded LRU of verified JWT claims, keyed by the raw token.
+
+    An entry is dropped once its token expires, so a hit never returns claims
+    that jwt.decode would now reject. Tokens without an "exp" claim are not cached.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()  # Sync dependencies may run in the threadpool
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[dict]:
+        with self._lock:
+            payload = self._entries.get(token)
+            if payload is None:
+                self.misses += 1
+                return None
+            if payload["exp"] <= time.time():
+                del self._entries[token]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return payload
+
+    def put(self, token: str, payload: dict):
+        if not isinstance(payload.get("exp"), (int, float)):
+            return
+        with self._lock:
+            self._entries[token] = payload
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RevocationList:
+    """Revoked token ids (jti) with their expiry; membership checks are a dict lookup.
+
+    Entries are only needed until the token would have expired anyway, so
+    expired ones are pruned as new revocations come in.
+    """
+
+    def __init__(self):
+        self._revoked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._next_prune = 0.0
+
+    def revoke(self, token_id: str, expires_at: float):
+        now = time.time()
+        with self._lock:
+            self._revoked[token_id] = expires_at
+            if now >= self._next_prune:
+                self._revoked = {k: exp for k, exp in self._revoked.items() if exp > now}
+                self._next_prune = now + 60
+
+    def is_revoked(self, token_id: str) -> bool:
+        return token_id in self._revoked
+
+    def __len__(self) -> int:
+        return len(self._revoked)
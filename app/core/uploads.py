@@ -0,0 +1,79 @@
+import hashlib
+import os
+import re
+import tempfile
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse
+
+CHUNK_SIZE = 1024 * 1024  # 1 MiB
+
+# Stored uploads are named after the SHA-256 of their content
+CONTENT_ADDRESSED_NAME = re.compile(r"^([0-9a-f]{64})\.[a-z0-9]+$")
+
+
+def _write_chunk(buffer, digest, chunk: bytes):
+    digest.update(chunk)
+    buffer.write(chunk)
+
+
+async def store_upload(upload: UploadFile, folder: str, max_bytes: int) -> str:
+    """Stream an upload into `folder` under its content hash and return the file name.
+
+    The file is written to a temp file in the same folder, hashed while it
+    streams, then atomically renamed to <sha256><ext>. If that name already
+    exists the content is identical and the temp file is simply dropped.
+    """
+    ext = os.path.splitext(upload.filename)[1].lower()
+    os.makedirs(folder, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".upload-", suffix=ext)
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            while True:
+                chunk = await upload.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"File larger than {max_bytes} bytes")
+                await run_in_threadpool(_write_chunk, buffer, digest, chunk)
+
+        file_name = f"{digest.hexdigest()}{ext}"
+        final_path = os.path.join(folder, file_name)
+        if os.path.exists(final_path):
+            os.remove(tmp_path)  # Same content already stored
+        else:
+            os.replace(tmp_path, final_path)
+        return file_name
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """StaticFiles that marks content-addressed files as immutable.
+
+    Their URL changes whenever their bytes do, so clients may cache them
+    forever; the content hash doubles as a strong ETag.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        match = CONTENT_ADDRESSED_NAME.match(os.path.basename(full_path))
+        if not match:
+            return super().file_response(full_path, stat_result, scope, status_code)
+
+        # The ETag has to be in place before the conditional check, so this
+        # mirrors StaticFiles.file_response instead of patching its result
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        response.headers["ETag"] = f'"{match.group(1)}"'
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
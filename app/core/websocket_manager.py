@@ -1,31 +1,239 @@
-from typing import Dict, List, Union
+from typing import Callable, Dict, List, Optional, Set, Union
 from fastapi import WebSocket
+from uuid import uuid4
+import asyncio
 import json
+from app.core.pubsub import InProcessPubSub, PubSubBackend
+
+DROP_OLDEST = "drop_oldest"
+DISCONNECT = "disconnect"
+
+
+class ClientConnection:
+    """A connected socket with its own bounded outbound queue and writer task."""
+
+    def __init__(self, user_id: int, websocket: WebSocket, queue_size: int):
+        self.user_id = user_id
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped_frames = 0
+        self.writer: Optional[asyncio.Task] = None
+
+    async def write_loop(self, manager: "ConnectionManager"):
+        try:
+            while True:
+                message = await self.queue.get()
+                if isinstance(message, dict):
+                    await self.websocket.send_json(message)  # <-- Proper JSON
+                else:
+                    await self.websocket.send_text(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Dead socket: stop writing and forget the connection
+            print(f"Dropping connection for user {self.user_id}: {e}")
+            manager.remove(self)
+
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[int, WebSocket] = {}
+    def __init__(
+        self,
+        queue_size: int = 256,
+        slow_consumer_policy: str = DROP_OLDEST,
+        backend: Optional[PubSubBackend] = None,
+    ):
+        if slow_consumer_policy not in (DROP_OLDEST, DISCONNECT):
+            raise ValueError(f"Unknown slow consumer policy: {slow_consumer_policy}")
+        self.queue_size = queue_size
+        self.slow_consumer_policy = slow_consumer_policy
+        self.active_connections: Dict[int, ClientConnection] = {}
+        self.dropped_frames = 0
+        self.slow_disconnects = 0
+
+        # Routing between workers/nodes sharing the same backend
+        self.node_id = uuid4().hex
+        self.backend = backend or InProcessPubSub()
+        self.remote_users: Dict[str, Set[int]] = {}
+        self._started = False
+
+        # Called with a user id whenever that user may have come online or gone offline
+        self.presence_listeners: List[Callable[[int], None]] = []
+
+        # Handlers for other message types sharing the backend, e.g. token revocations
+        self.message_handlers: Dict[str, Callable[[dict], None]] = {}
+
+    async def start(self):
+        self._started = True
+        await self.backend.start(self._on_backend_message)
+
+    async def stop(self):
+        if self._started:
+            await self._publish({"type": "node_down"})
+            self._started = False
+            await self.backend.stop()
+
+    def _presence_changed(self, user_ids):
+        for user_id in user_ids:
+            for listener in self.presence_listeners:
+                listener(user_id)
+
+    def _set_remote_users(self, origin: str, users: Set[int]):
+        previous = self.remote_users.get(origin, set())
+        if users:
+            self.remote_users[origin] = users
+        else:
+            self.remote_users.pop(origin, None)
+        self._presence_changed(previous ^ users)
+
+    async def _publish(self, message: dict):
+        if self._started:
+            message["origin"] = self.node_id
+            await self.backend.publish(message)
 
-    async def connect(self, user_id: int, websocket: WebSocket):
+    async def publish(self, message: dict):
+        """Send a message to every other node; they dispatch it via message_handlers."""
+        await self._publish(message)
+
+    def _publish_later(self, message: dict):
+        if self._started:
+            asyncio.get_running_loop().create_task(self._publish(message))
+
+    async def _on_backend_message(self, message: dict):
+        origin = message.get("origin")
+        if origin == self.node_id:
+            return
+
+        msg_type = message.get("type")
+        if msg_type == "direct":
+            connection = self.active_connections.get(message["receiver_id"])
+            if connection is not None:
+                self._enqueue(connection, message["message"])
+        elif msg_type == "broadcast":
+            self._broadcast_local(message["message"], message["sender_id"])
+        elif msg_type == "hello":
+            # A node (re)joined: record its users and answer with ours
+            self._set_remote_users(origin, set(message.get("users", [])))
+            await self._publish({"type": "presence", "users": list(self.active_connections.keys())})
+        elif msg_type == "presence":
+            self._set_remote_users(origin, set(message["users"]))
+        elif msg_type == "online":
+            self.remote_users.setdefault(origin, set()).add(message["user_id"])
+            self._presence_changed([message["user_id"]])
+        elif msg_type == "offline":
+            self.remote_users.get(origin, set()).discard(message["user_id"])
+            self._presence_changed([message["user_id"]])
+        elif msg_type == "node_down":
+            self._set_remote_users(origin, set())
+        elif msg_type == "connected":
+            # Attached (or re-attached) to the backend: rebuild presence from scratch
+            for node in list(self.remote_users):
+                self._set_remote_users(node, set())
+            await self._publish({"type": "hello", "users": list(self.active_connections.keys())})
+        elif msg_type in self.message_handlers:
+            self.message_handlers[msg_type](message)
+
+    async def connect(self, user_id: int, websocket: WebSocket) -> ClientConnection:
+        """Accept the socket and make it the user's current connection.
+
+        Hand the returned connection to remove() when the socket closes;
+        disconnect(user_id) would also evict a newer socket from a reconnect.
+        """
         await websocket.accept()
-        self.active_connections[user_id] = websocket
+        previous = self.active_connections.pop(user_id, None)
+        if previous is not None:
+            if previous.writer is not None:
+                previous.writer.cancel()
+            # Its handler would otherwise keep acting as this user; closing it makes the handler exit
+            await self._close(previous.websocket, code=1008)
+
+        connection = ClientConnection(user_id, websocket, self.queue_size)
+        connection.writer = asyncio.create_task(connection.write_loop(self))
+        self.active_connections[user_id] = connection
+        self._presence_changed([user_id])
+        await self._publish({"type": "online", "user_id": user_id})
+        return connection
 
     def disconnect(self, user_id: int):
-        self.active_connections.pop(user_id, None)
+        connection = self.active_connections.pop(user_id, None)
+        if connection is not None:
+            if connection.writer is not None:
+                connection.writer.cancel()
+            self._presence_changed([user_id])
+            self._publish_later({"type": "offline", "user_id": user_id})
+
+    def remove(self, connection: ClientConnection):
+        # Only forget the connection if it has not been replaced by a newer one
+        if self.active_connections.get(connection.user_id) is connection:
+            self.active_connections.pop(connection.user_id, None)
+            self._presence_changed([connection.user_id])
+            self._publish_later({"type": "offline", "user_id": connection.user_id})
+        if connection.writer is not None and connection.writer is not asyncio.current_task():
+            connection.writer.cancel()
+
+    def _enqueue(self, connection: ClientConnection, message: Union[str, dict]):
+        try:
+            connection.queue.put_nowait(message)
+            return
+        except asyncio.QueueFull:
+            pass
+
+        if self.slow_consumer_policy == DROP_OLDEST:
+            connection.queue.get_nowait()
+            connection.queue.put_nowait(message)
+            connection.dropped_frames += 1
+            self.dropped_frames += 1
+        else:
+            self.dropped_frames += 1 + connection.queue.qsize()
+            self.slow_disconnects += 1
+            self.remove(connection)
+            asyncio.create_task(self._close(connection.websocket, code=1013))  # Try again later
+
+    async def _close(self, websocket: WebSocket, code: int):
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            pass
 
     async def send_personal_message(self, message: Union[str, dict], receiver_id: int):
-       if receiver_id in self.active_connections:
-           websocket = self.active_connections[receiver_id]
-           if isinstance(message, dict):
-            await websocket.send_json(message)  # <-- Proper JSON
-           else:
-            await websocket.send_text(message)
+        connection = self.active_connections.get(receiver_id)
+        if connection is not None:
+            self._enqueue(connection, message)
+        elif self.is_online(receiver_id):
+            # Receiver is connected to another worker/node
+            await self._publish({"type": "direct", "receiver_id": receiver_id, "message": message})
+
+    def is_online(self, user_id: int) -> bool:
+        if user_id in self.active_connections:
+            return True
+        return any(user_id in users for users in self.remote_users.values())
 
     def get_online_users(self):
-        return list(self.active_connections.keys())
-    
+        online = list(self.active_connections.keys())
+        seen = set(online)
+        for users in self.remote_users.values():
+            for user_id in users:
+                if user_id not in seen:
+                    seen.add(user_id)
+                    online.append(user_id)
+        return online
+
+    def _broadcast_local(self, message: Union[str, dict], sender_id: int):
+        # Queue-only fan-out: each socket's writer task delivers independently
+        for connection in list(self.active_connections.values()):
+            if connection.user_id != sender_id:
+                self._enqueue(connection, message)
+
     async def send_broadcast(self, message: str, sender_id: int):
-        for uid, connection in self.active_connections.items():
-            if uid != sender_id:
-                await connection.send_text(message)
+        self._broadcast_local(message, sender_id)
+        await self._publish({"type": "broadcast", "sender_id": sender_id, "message": message})
 
+    def stats(self) -> dict:
+        depths = [c.queue.qsize() for c in self.active_connections.values()]
+        return {
+            "connections": len(depths),
+            "remote_users": sum(len(users) for users in self.remote_users.values()),
+            "queued_frames": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "dropped_frames": self.dropped_frames,
+            "slow_consumer_disconnects": self.slow_disconnects,
+        }
@@ -1,12 +1,94 @@
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.read_routing import pinned_to_primary, user_pinned
 
-engine = create_engine(settings.DATABASE_URL)
+
+def _is_sqlite_memory(url) -> bool:
+    return url.get_backend_name() == "sqlite" and (
+        url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+    )
+
+
+def engine_options(database_url: str) -> dict:
+    """Pool settings for create_engine / create_async_engine.
+
+    In-memory SQLite uses a single shared connection, so it takes no pool sizing.
+    """
+    url = make_url(database_url)
+    if _is_sqlite_memory(url):
+        return {}
+    options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if url.get_backend_name() == "sqlite":
+        # Compiled statements kept per connection by the sqlite3 module (default 128)
+        options["connect_args"] = {"cached_statements": settings.SQLITE_CACHED_STATEMENTS}
+    return options
+
+
+def sqlite_pragmas() -> dict:
+    # WAL lets readers run alongside the writer; NORMAL only fsyncs at checkpoints in WAL mode
+    return {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+    }
+
+
+def apply_sqlite_pragmas(engine, pragmas: dict):
+    """Run `PRAGMA name=value` on every new connection of a SQLite engine (sync or async)."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if sync_engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+apply_sqlite_pragmas(engine, sqlite_pragmas())
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for the chat path and hot read endpoints (aiosqlite / asyncpg)
+async_engine = create_async_engine(settings.async_database_url, **engine_options(settings.async_database_url))
+apply_sqlite_pragmas(async_engine, sqlite_pragmas())
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False, class_=AsyncSession)
+
+# Optional read replica for read-only endpoints; without one they use the primary
+if settings.READ_DATABASE_URL:
+    read_engine = create_engine(settings.READ_DATABASE_URL, **engine_options(settings.READ_DATABASE_URL))
+    apply_sqlite_pragmas(read_engine, sqlite_pragmas())
+    async_read_engine = create_async_engine(
+        settings.async_read_database_url, **engine_options(settings.async_read_database_url)
+    )
+    apply_sqlite_pragmas(async_read_engine, sqlite_pragmas())
+else:
+    read_engine, async_read_engine = engine, async_engine
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+AsyncReadSessionLocal = async_sessionmaker(
+    async_read_engine, autoflush=False, expire_on_commit=False, class_=AsyncSession
+)
+
 Base = declarative_base()
 
 def get_db():
@@ -14,4 +96,33 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def use_primary(request: Request) -> bool:
+    return read_engine is engine or pinned_to_primary(request)
+
+
+def get_read_db(request: Request):
+    """Session for read-only endpoints: the replica, unless this client just wrote."""
+    db = SessionLocal() if use_primary(request) else ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db(request: Request):
+    session_factory = AsyncSessionLocal if use_primary(request) else AsyncReadSessionLocal
+    async with session_factory() as db:
+        yield db
+
+async def get_async_user_read_db(request: Request, user_id: int):
+    """Like get_async_read_db, but also the primary while `user_id` has a chat write pinned."""
+    primary = use_primary(request) or user_pinned(user_id)
+    session_factory = AsyncSessionLocal if primary else AsyncReadSessionLocal
+    async with session_factory() as db:
+        yield db
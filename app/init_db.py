@@ -0,0 +1,135 @@
+"""Create any missing tables, columns and indexes on DATABASE_URL.
+
+    python -m app.init_db
+    python -m app.init_db --rebuild-inbox   # also recompute conversation summaries from messages
+
+Columns added to a model after its table was created are added with
+ALTER TABLE; existing rows get the column's scalar default, or a value
+derived from other rows where one is registered in BACKFILLS. Tables in
+TABLE_BACKFILLS are filled from older data when an existing database
+gains them (e.g. read_watermarks from the legacy messages.is_seen flags).
+The app no longer does this at import time; set CREATE_SCHEMA_ON_STARTUP=true
+to have the lifespan run it instead (handy for local SQLite files).
+"""
+import argparse
+from sqlalchemy import Column, String, case, cast, func, inspect, select, text, update
+from sqlalchemy.schema import CreateColumn
+from app.database import Base, SessionLocal, engine
+from app.models import like, message, track, user  # noqa: F401  Registers the tables on Base.metadata
+from app.core import search  # noqa: F401  Registers the full-text index DDL on Base.metadata
+
+
+def _backfill_like_count(connection):
+    counts = (
+        select(func.count()).select_from(like.Like)
+        .where(like.Like.track_id == track.Track.id)
+        .scalar_subquery()
+    )
+    connection.execute(update(track.Track).values(like_count=counts))
+
+
+def _backfill_conversation_key(connection):
+    # Same "low:high" format as message.conversation_key()
+    Message = message.Message
+    low = case((Message.sender_id <= Message.receiver_id, Message.sender_id), else_=Message.receiver_id)
+    high = case((Message.sender_id <= Message.receiver_id, Message.receiver_id), else_=Message.sender_id)
+    connection.execute(
+        update(Message).where(Message.conversation_key.is_(None))
+        .values(conversation_key=cast(low, String) + ":" + cast(high, String))
+    )
+    if connection.dialect.name != "sqlite":
+        # SQLite cannot tighten a column in place; the ORM default covers new rows there
+        connection.execute(text("ALTER TABLE messages ALTER COLUMN conversation_key SET NOT NULL"))
+
+
+def _watermarks_from_seen_flags(connection):
+    # Before watermarks, each message carried is_seen; the newest seen id per conversation becomes the watermark
+    Message, ReadWatermark = message.Message, message.ReadWatermark
+    seen = (
+        select(Message.receiver_id, Message.conversation_key, func.max(Message.id), func.current_timestamp())
+        .where(Message.is_seen.is_(True), Message.receiver_id.is_not(None))
+        .group_by(Message.receiver_id, Message.conversation_key)
+    )
+    connection.execute(ReadWatermark.__table__.insert().from_select(
+        ["reader_id", "conversation_key", "last_seen_message_id", "updated_at"], seen
+    ))
+
+
+# (table, column) -> fills the column for rows that existed before it did
+BACKFILLS = {
+    ("tracks", "like_count"): _backfill_like_count,
+    ("messages", "conversation_key"): _backfill_conversation_key,
+}
+
+# table -> fills a newly created table from data that predates it
+TABLE_BACKFILLS = {
+    "read_watermarks": _watermarks_from_seen_flags,
+}
+
+
+def add_missing_columns(connection) -> list:
+    """ALTER TABLE .. ADD COLUMN for every model column the database lacks.
+
+    A NOT NULL column without a server default cannot be added to a table
+    that already has rows, so it is added as nullable; its backfill fills it.
+    Returns the (table, column) pairs that were added.
+    """
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        present = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in present:
+                continue
+            if not column.nullable and column.server_default is None:
+                column = Column(column.name, column.type, nullable=True)
+            ddl = CreateColumn(column).compile(dialect=connection.dialect)
+            connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+            added.append((table.name, column.name))
+    return added
+
+
+def _backfill_scalar_default(connection, table_name: str, column_name: str):
+    column = Base.metadata.tables[table_name].c[column_name]
+    if column.default is not None and column.default.is_scalar:
+        connection.execute(
+            update(column.table).where(column.is_(None)).values({column_name: column.default.arg})
+        )
+
+
+def create_schema():
+    with engine.begin() as connection:
+        existing_tables = set(inspect(connection).get_table_names())
+        Base.metadata.create_all(bind=connection)
+        for added in add_missing_columns(connection):
+            if added in BACKFILLS:
+                BACKFILLS[added](connection)
+            else:
+                _backfill_scalar_default(connection, *added)
+            print(f"Added column {added[0]}.{added[1]}")
+        if existing_tables:
+            for table_name, backfill in TABLE_BACKFILLS.items():
+                if table_name not in existing_tables:
+                    backfill(connection)
+                    print(f"Filled new table {table_name}")
+        # create_all skips existing tables, including indexes added to them later
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=connection, checkfirst=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rebuild-inbox", action="store_true", help="Recompute conversation_summaries from messages")
+    args = parser.parse_args()
+
+    create_schema()
+    print(f"Schema ready on {engine.url.render_as_string(hide_password=True)}")
+    if args.rebuild_inbox:
+        from app.core.inbox import rebuild_summaries
+        with SessionLocal() as db:
+            rebuild_summaries(db)
+        print("Conversation summaries rebuilt")
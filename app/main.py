@@ -1,20 +1,51 @@
-from datetime import datetime
-from fastapi import FastAPI, Depends, HTTPException
-from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session
-from app.models import user as user_model, track as track_model, like as like_model
-from app.schemas import user as user_schema, track as track_schema , like as like_schema 
-from app.database import get_db, Base, engine
-from passlib.context import CryptContext
-from app.api.endpoints import auth , tracks, likes , users , chat , messages , websocket
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from app.database import engine, async_engine, read_engine, async_read_engine
+from app.api.endpoints import auth , tracks, likes , users , chat , messages , websocket, metrics, health
 from app.core.config import settings
+from app.core.uploads import ImmutableStaticFiles
+from app.core.manager_instance import manager, message_writer
+from app.core.audio_jobs import audio_jobs
+from app.core.recommender import recommender
+from app.core.security import password_hasher
+from app.core.metrics import MetricsMiddleware, instrument_engine
+from app.core.startup import readiness, warmup
+from app.core.read_routing import ReadYourWritesMiddleware
 from fastapi.middleware.cors import CORSMiddleware
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Per-request SQL counts and timings for /metrics and the slow-request log
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+if read_engine is not engine:
+    instrument_engine(read_engine)
+    instrument_engine(async_read_engine.sync_engine)
 
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title=settings.APP_NAME)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.CREATE_SCHEMA_ON_STARTUP:
+        from app.init_db import create_schema
+        await run_in_threadpool(create_schema)
+    await manager.start()
+    recommender.start()
+    # Serve right away; /ready reports when pools and caches are warm
+    warmup_task = asyncio.create_task(warmup())
+    yield
+    readiness.stopping = True
+    warmup_task.cancel()
+    await message_writer.stop()
+    await audio_jobs.stop()
+    await recommender.stop()
+    password_hasher.stop()
+    await manager.stop()
+    await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
+
+
+app = FastAPI(title=settings.APP_NAME, lifespan=lifespan)
 
 # Include routers for different endpoints
 
@@ -25,6 +56,8 @@ app.include_router(users.router)
 app.include_router(chat.router)
 app.include_router(messages.router)
 app.include_router(websocket.router)
+app.include_router(metrics.router)
+app.include_router(health.router)
 
 origins = [
     "http://localhost",
@@ -42,5 +75,11 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+# Pins clients that just wrote to the primary for their next reads
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Outermost, so latency includes every other middleware
+app.add_middleware(MetricsMiddleware)
+
 # Mount static directory so files are accessible via /music_files/filename
-app.mount("/music_files", StaticFiles(directory="app/static/music_files"), name="music_files")
+app.mount("/music_files", ImmutableStaticFiles(directory="app/static/music_files"), name="music_files")
@@ -1,14 +1,27 @@
-from sqlalchemy import Boolean, Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Boolean, Column, Integer, String, ForeignKey, DateTime, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
 
+
+def conversation_key(user_a: int, user_b: int) -> str:
+    """Order-independent key shared by every message between two users."""
+    low, high = sorted((int(user_a), int(user_b)))
+    return f"{low}:{high}"
+
+
+def _default_conversation_key(context):
+    params = context.get_current_parameters()
+    return conversation_key(params["sender_id"], params["receiver_id"])
+
+
 class Message(Base):
     __tablename__ = "messages"
 
     id = Column(Integer, primary_key=True, index=True)
     sender_id = Column(Integer, ForeignKey("users.id"))
     receiver_id = Column(Integer, ForeignKey("users.id"))
+    conversation_key = Column(String, nullable=False, default=_default_conversation_key)
     content = Column(String)
     timestamp = Column(DateTime, default=datetime.utcnow)
     is_delivered = Column(Boolean, default=False)
@@ -19,6 +32,13 @@ class Message(Base):
 
     reactions = relationship("MessageReaction", back_populates="message", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Keyset pagination walks a single conversation by id
+        Index("ix_messages_conversation_id", "conversation_key", "id"),
+        # Reconnect sync: everything a user received after a given id
+        Index("ix_messages_receiver_id_id", "receiver_id", "id"),
+    )
+
 
 class MessageReaction(Base):
     __tablename__ = "message_reactions"
@@ -32,3 +52,44 @@ class MessageReaction(Base):
     message = relationship("Message", back_populates="reactions")
     user = relationship("User")
 
+
+class ReadWatermark(Base):
+    """Highest message id a reader has seen in a conversation.
+
+    A message is seen by its receiver when its id is at or below the
+    receiver's watermark for that conversation.
+    """
+    __tablename__ = "read_watermarks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    reader_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    conversation_key = Column(String, nullable=False)
+    last_seen_message_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (UniqueConstraint("reader_id", "conversation_key", name="_reader_conversation_uc"),)
+
+
+class ConversationSummary(Base):
+    """Inbox entry: one row per participant of a conversation.
+
+    Updated in the same transaction that stores messages or advances a read
+    watermark, so listing a user's conversations never touches messages.
+    """
+    __tablename__ = "conversation_summaries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    other_user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    conversation_key = Column(String, nullable=False)
+    last_message_id = Column(Integer, nullable=False)
+    last_sender_id = Column(Integer, nullable=False)
+    last_message_preview = Column(String, nullable=False, default="")
+    last_message_at = Column(DateTime)
+    unread_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "conversation_key", name="_user_conversation_uc"),
+        # Inbox pages: a user's conversations by most recent message
+        Index("ix_conversation_summaries_user_last_message", "user_id", "last_message_id"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, LargeBinary, String, DateTime
 from datetime import datetime
 from app.database import Base
 
@@ -6,9 +6,21 @@ class Track(Base):
     __tablename__ = "tracks"
 
     id = Column(Integer, primary_key=True, index=True)
-    title = Column(String, nullable=False)
+    title = Column(String, nullable=False, index=True)
     artist = Column(String, nullable=False)
     album = Column(String, nullable=True)
     duration = Column(Integer, nullable=True)  # seconds
+    bitrate = Column(Integer, nullable=True)  # kbps, filled in by audio analysis
+    sample_rate = Column(Integer, nullable=True)  # Hz, filled in by audio analysis
+    waveform = Column(LargeBinary, nullable=True)  # Downsampled peaks, one byte (0-255) per point
+    like_count = Column(Integer, nullable=False, default=0, server_default="0")  # Kept in step with likes
     created_at = Column(DateTime, default=datetime.utcnow)
     file_url = Column(String, nullable=True)  # <- for uploaded file URL
+
+
+class CatalogVersion(Base):
+    """Single-row counter bumped in every transaction that changes the track catalog."""
+    __tablename__ = "catalog_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
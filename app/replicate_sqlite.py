@@ -0,0 +1,49 @@
+"""Copy the primary SQLite database over the READ_DATABASE_URL file on an interval.
+
+A local stand-in for a streaming replica, to try read routing and replica lag
+without a second database server:
+
+    READ_DATABASE_URL=sqlite:///./replica.db python -m app.replicate_sqlite --interval 2
+
+Uses SQLite's online backup API, so the copy is consistent while the app writes.
+"""
+import argparse
+import sqlite3
+import time
+from sqlalchemy.engine import make_url
+from app.core.config import settings
+
+
+def sqlite_path(database_url: str) -> str:
+    url = make_url(database_url)
+    if url.get_backend_name() != "sqlite" or not url.database or url.database == ":memory:":
+        raise SystemExit(f"Not a SQLite file URL: {database_url}")
+    return url.database
+
+
+def copy_once(primary: str, replica: str):
+    source = sqlite3.connect(primary)
+    target = sqlite3.connect(replica)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--interval", type=float, default=2.0, help="Seconds between copies (the simulated lag)")
+    parser.add_argument("--once", action="store_true")
+    args = parser.parse_args()
+
+    if not settings.READ_DATABASE_URL:
+        raise SystemExit("READ_DATABASE_URL is not set")
+    primary, replica = sqlite_path(settings.DATABASE_URL), sqlite_path(settings.READ_DATABASE_URL)
+    while True:
+        started = time.perf_counter()
+        copy_once(primary, replica)
+        print(f"Copied {primary} -> {replica} in {(time.perf_counter() - started) * 1000:.0f} ms")
+        if args.once:
+            break
+        time.sleep(args.interval)
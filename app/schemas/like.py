@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from typing import Dict, List
+from pydantic import BaseModel, Field
 from datetime import datetime
 
 # Base Like schema
@@ -17,3 +18,18 @@ class LikeOut(LikeBase):
 
     class Config:
         from_attributes = True
+
+# Schema for liking/unliking several tracks at once
+class LikeBatch(BaseModel):
+    user_id: int
+    track_ids: List[int] = Field(..., min_length=1, max_length=500)
+
+# Tracks whose like state actually changed
+class LikeBatchOut(BaseModel):
+    user_id: int
+    track_ids: List[int]
+
+# Liked state for a list of tracks
+class LikeStatusOut(BaseModel):
+    user_id: int
+    liked: Dict[int, bool]
@@ -15,3 +15,14 @@ class MessageOut(BaseModel):
 
     class Config:
         orm_mode = True
+
+class ConversationOut(BaseModel):
+    other_user_id: int
+    last_message_id: int
+    last_sender_id: int
+    last_message_preview: str
+    last_message_at: Optional[datetime]
+    unread_count: int
+
+    class Config:
+        orm_mode = True
@@ -8,6 +8,8 @@ class TrackBase(BaseModel):
     artist: str
     album: Optional[str] = None
     duration: Optional[int] = None  # seconds 
+    bitrate: Optional[int] = None  # kbps, detected from the file
+    sample_rate: Optional[int] = None  # Hz, detected from the file
     file_url: Optional[str] = None  # URL to the track file 
 
 # Schema for creating a track (when admin uploads track)
@@ -24,3 +26,26 @@ class TrackOut(TrackBase):
 
     class Config:
         orm_mode = True
+
+# Schema for track search results
+class TrackSearchResult(TrackBase):
+    id: int
+
+    class Config:
+        from_attributes = True
+
+# Schema for the most liked tracks
+class TrackRanked(TrackBase):
+    id: int
+    like_count: int
+
+    class Config:
+        from_attributes = True
+
+# Schema for similar/recommended tracks
+class TrackRecommendation(TrackBase):
+    id: int
+    score: float
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,73 @@
+"""Compare the sync (threadpool) and async database paths under concurrent load.
+
+Runs the same chat-history style query through SessionLocal + run_in_threadpool
+and through AsyncSessionLocal, at increasing concurrency, against a seeded
+SQLite database.
+
+    python -m benchmarks.async_vs_sync_db --requests 2000 --concurrency 10 50 200
+"""
+import argparse
+import asyncio
+import json
+
+from benchmarks.common import configure, run_load
+
+configure("async")
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+
+from app.database import AsyncSessionLocal, Base, SessionLocal, async_engine, engine
+from app.models.message import Message, conversation_key
+from app.models.user import User
+
+
+def seed(messages: int):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        db.add_all([User(email="a@bench", password="x"), User(email="b@bench", password="x")])
+        db.commit()
+        db.bulk_insert_mappings(Message, [
+            {
+                "sender_id": 1 + i % 2,
+                "receiver_id": 2 - i % 2,
+                "conversation_key": conversation_key(1, 2),
+                "content": f"message {i}",
+            }
+            for i in range(messages)
+        ])
+        db.commit()
+
+
+def _page_query():
+    return select(Message).where(Message.conversation_key == conversation_key(1, 2)).order_by(Message.id.desc()).limit(20)
+
+
+def sync_page():
+    with SessionLocal() as db:
+        return db.execute(_page_query()).scalars().all()
+
+
+async def async_page():
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(_page_query())).scalars().all()
+
+
+async def main(args):
+    for concurrency in args.concurrency:
+        sync_stats = await run_load(lambda _: run_in_threadpool(sync_page), args.requests, concurrency)
+        async_stats = await run_load(lambda _: async_page(), args.requests, concurrency)
+        print(json.dumps({"concurrency": concurrency, "sync": sync_stats, "async": async_stats}))
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    args = parser.parse_args()
+
+    seed(args.messages)
+    asyncio.run(main(args))
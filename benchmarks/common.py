@@ -0,0 +1,89 @@
+"""Shared helpers for the benchmark scripts: environment, seeded database and latency stats.
+
+Call configure() before importing anything from `app`, since settings and
+engines are created at import time.
+"""
+import asyncio
+import os
+import subprocess
+import tempfile
+import time
+from collections import Counter
+from typing import Awaitable, Callable, List, Optional
+
+
+def configure(name: str) -> str:
+    """Point the app at a throwaway SQLite file (unless DATABASE_URL is set) and return its URL."""
+    db_file = os.path.join(tempfile.gettempdir(), f"spotify_api_bench_{name}.db")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{db_file}")
+    os.environ.setdefault("APP_NAME", "spotify_api-bench")
+    os.environ.setdefault("SECRET_KEY", "bench")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+    return os.environ["DATABASE_URL"]
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int = 0, statuses: Optional[Counter] = None) -> dict:
+    """Throughput and latency percentiles (ms) for one scenario."""
+    latencies = sorted(latencies)
+
+    def percentile(p: float) -> Optional[float]:
+        if not latencies:
+            return None
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2)
+
+    summary = {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+    }
+    if statuses is not None:
+        summary["status_counts"] = {str(code): count for code, count in sorted(statuses.items(), key=lambda item: str(item[0]))}
+    return summary
+
+
+async def run_load(call: Callable[[int], Awaitable[object]], total: int, concurrency: int) -> dict:
+    """Run `call(i)` for i in range(total) with `concurrency` concurrent workers.
+
+    A call counts as an error if it raises or returns an HTTP response with a
+    status code of 400 or above.
+    """
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in remaining:
+            started = time.perf_counter()
+            try:
+                result = await call(i)
+            except Exception:
+                errors += 1
+                statuses["exception"] += 1
+                continue
+            status = getattr(result, "status_code", None)
+            if status is not None:
+                statuses[status] += 1
+                if status >= 400:
+                    errors += 1
+                    continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, errors, statuses or None)
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
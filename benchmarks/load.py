@@ -0,0 +1,239 @@
+"""Load-test the REST and WebSocket paths and report throughput and latency as JSON.
+
+Seeds a SQLite database, starts the app with uvicorn on a free localhost port
+(in a background thread of this process) and drives each scenario over real
+HTTP/WebSocket connections:
+
+    catalog    GET /tracks/all pages and GET /tracks/{id}
+    likes      like/unlike churn on random (user, track) pairs
+    login      bursts of POST /auth/login (bcrypt in the hashing pool)
+    history    GET /chat/history/ scrollback with before_id cursors
+    websocket  N clients on /chat/ws/{user_id} exchanging messages in a ring
+
+    python -m benchmarks.load --output bench.json
+    python -m benchmarks.load --scenarios catalog websocket --ws-clients 200
+
+Pass --url to target a server that is already running; it must use the same
+DATABASE_URL as this script so the seeded rows are there.
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+from benchmarks.common import configure, git_revision, run_load, summarize
+
+DATABASE_URL = configure("load")
+
+import httpx
+import uvicorn
+import websockets
+
+from app.core.config import settings
+from app.core.hashing import crypt_context
+from app.core.security import create_access_token
+from app.database import Base, SessionLocal, engine
+from app.models import like, message, track, user  # noqa: F401  Registers every table before create_all
+from app.models.message import Message, conversation_key
+from app.models.track import Track
+from app.models.user import User
+
+PASSWORD = "bench-password"
+
+
+def seed(args):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    password = crypt_context(settings.BCRYPT_ROUNDS).hash(PASSWORD)
+    with SessionLocal() as db:
+        db.bulk_insert_mappings(User, [
+            {"email": f"user{i}@bench", "password": password, "role": "admin" if i == 0 else "user"}
+            for i in range(args.users)
+        ])
+        db.bulk_insert_mappings(Track, [
+            {"title": f"Track {i}", "artist": f"Artist {i % 500}", "album": f"Album {i % 2000}", "duration": 180 + i % 120}
+            for i in range(args.tracks)
+        ])
+        # One long conversation between users 1 and 2 for scrollback
+        db.bulk_insert_mappings(Message, [
+            {
+                "sender_id": 1 + i % 2,
+                "receiver_id": 2 - i % 2,
+                "conversation_key": conversation_key(1, 2),
+                "content": f"message {i}",
+            }
+            for i in range(args.messages)
+        ])
+        db.commit()
+
+
+class LocalServer:
+    """uvicorn serving the app on 127.0.0.1 in a background thread."""
+
+    def __init__(self):
+        from app.main import app
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self) -> str:
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.05)
+        port = self.server.servers[0].sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+async def catalog(client: httpx.AsyncClient, args) -> dict:
+    async def call(i):
+        if i % 2:
+            return await client.get(f"/tracks/{random.randint(1, args.tracks)}")
+        cursor = random.randint(0, max(args.tracks - 50, 0))
+        return await client.get("/tracks/all", params={"limit": 50, "cursor": cursor})
+    return await run_load(call, args.requests, args.concurrency)
+
+
+async def likes(client: httpx.AsyncClient, args) -> dict:
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': '1', 'email': 'user0@bench', 'role': 'admin'})}"}
+
+    def pair(i):
+        return {"user_id": 1 + i % args.users, "track_id": 1 + (i * 7919) % args.tracks}
+
+    # Like a batch of distinct pairs, then unlike the same pairs
+    liked = await run_load(lambda i: client.post("/likes/create_like", json=pair(i), headers=headers),
+                           args.requests // 2, args.concurrency)
+    unliked = await run_load(lambda i: client.post("/likes/unlike", json=pair(i), headers=headers),
+                             args.requests // 2, args.concurrency)
+    return {"like": liked, "unlike": unliked}
+
+
+async def login(client: httpx.AsyncClient, args) -> dict:
+    async def call(i):
+        return await client.post("/auth/login", data={"username": f"user{i % args.users}@bench", "password": PASSWORD})
+    return await run_load(call, args.login_requests, args.login_concurrency)
+
+
+async def history(client: httpx.AsyncClient, args) -> dict:
+    async def call(i):
+        before_id = random.randint(50, max(args.messages, 51))
+        return await client.get("/chat/history/", params={
+            "user_id": 1, "other_user_id": 2, "limit": 50, "before_id": before_id
+        })
+    return await run_load(call, args.requests, args.concurrency)
+
+
+async def websocket(base_url: str, args) -> dict:
+    """Each client sends --ws-messages messages to the next client in the ring.
+
+    Latency is measured from send until the receiver reads the frame.
+    """
+    ws_url = base_url.replace("http", "ws", 1)
+    clients = args.ws_clients
+    latencies = []
+    errors = 0
+
+    async def client(index: int, sockets: list, ready: asyncio.Event):
+        nonlocal errors
+        user_id = 1 + index
+        peer_id = 1 + (index + 1) % clients
+        async with websockets.connect(f"{ws_url}/chat/ws/{user_id}", max_queue=None) as ws:
+            sockets[index] = ws
+            await ready.wait()
+
+            async def receive():
+                received = 0
+                while received < args.ws_messages:
+                    frame = json.loads(await ws.recv())
+                    if frame.get("type") == "chat_message" and frame.get("receiver_id") == user_id:
+                        latencies.append(time.perf_counter() - float(frame["message"]))
+                        received += 1
+
+            async def send():
+                for _ in range(args.ws_messages):
+                    await ws.send(json.dumps({
+                        "type": "chat_message", "receiver_id": peer_id, "message": repr(time.perf_counter())
+                    }))
+                    await asyncio.sleep(args.ws_interval)
+
+            try:
+                await asyncio.wait_for(asyncio.gather(receive(), send()), timeout=args.ws_timeout)
+            except asyncio.TimeoutError:
+                errors += 1
+
+    sockets = [None] * clients
+    ready = asyncio.Event()
+    tasks = [asyncio.create_task(client(i, sockets, ready)) for i in range(clients)]
+    while not all(sockets):  # Everyone is connected before the first message is sent
+        await asyncio.sleep(0.05)
+    started = time.perf_counter()
+    ready.set()
+    await asyncio.gather(*tasks)
+    summary = summarize(latencies, time.perf_counter() - started, errors)
+    summary["clients"] = clients
+    summary["requests"] = len(latencies)  # Delivered messages; errors are clients that timed out
+    return summary
+
+
+async def run_scenarios(base_url: str, args) -> dict:
+    results = {}
+    limits = httpx.Limits(max_connections=args.concurrency + args.login_concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        for name in args.scenarios:
+            if name == "websocket":
+                results[name] = await websocket(base_url, args)
+            else:
+                results[name] = await SCENARIOS[name](client, args)
+            print(f"{name}: {results[name]}", flush=True)
+    return results
+
+
+SCENARIOS = {"catalog": catalog, "likes": likes, "login": login, "history": history, "websocket": None}
+
+
+def main(args):
+    random.seed(args.seed)
+    seed(args)
+    if args.url:
+        results = asyncio.run(run_scenarios(args.url.rstrip("/"), args))
+    else:
+        with LocalServer() as base_url:
+            results = asyncio.run(run_scenarios(base_url, args))
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "database_url": DATABASE_URL,
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "scenarios": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--url", help="Benchmark an already running server instead of starting one")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--tracks", type=int, default=10000)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--login-requests", type=int, default=100)
+    parser.add_argument("--login-concurrency", type=int, default=20)
+    parser.add_argument("--ws-clients", type=int, default=100)
+    parser.add_argument("--ws-messages", type=int, default=20)
+    parser.add_argument("--ws-interval", type=float, default=0.01)
+    parser.add_argument("--ws-timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,71 @@
+"""Build the item-item recommendation index from a synthetic like table.
+
+Generates `--likes` (user, track) pairs with Zipf-like track popularity and
+reports build time, peak memory traced during the build and the size of the
+resulting neighbour index. The incremental path is measured by refreshing
+the rows touched by `--refresh-likes` new likes.
+
+    python -m benchmarks.recommender_build --likes 10000000 --users 1000000 --tracks 100000
+"""
+import argparse
+import resource
+import time
+import tracemalloc
+
+from benchmarks.common import configure
+
+configure("recommender")
+
+import numpy as np
+
+from app.core.recommender import Recommender, build_neighbors, _SHIFT, _TRACK_MASK, _unique
+
+
+def synthetic_likes(likes: int, users: int, tracks: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    popularity = 1.0 / np.arange(1, tracks + 1) ** 0.9
+    popularity /= popularity.sum()
+    user_ids = rng.integers(1, users + 1, likes, dtype=np.int64)
+    track_ids = rng.choice(np.arange(1, tracks + 1, dtype=np.int64), size=likes, p=popularity)
+    return _unique((user_ids << _SHIFT) | track_ids)  # A user likes a track at most once
+
+
+def main(args):
+    started = time.perf_counter()
+    likes = synthetic_likes(args.likes, args.users, args.tracks)
+    print(f"generated {len(likes):,} unique likes in {time.perf_counter() - started:.1f}s")
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    index = build_neighbors(likes >> _SHIFT, likes & _TRACK_MASK, k=args.k, max_user_likes=args.max_user_likes)
+    build_seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"full build: {build_seconds:.1f}s, "
+          f"peak traced memory {peak / 2**20:.0f} MiB, "
+          f"process max RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB")
+    print(f"index: {len(index.track_ids):,} tracks, {len(index.neighbor_ids):,} neighbours, "
+          f"{index.nbytes / 2**20:.1f} MiB (+{likes.nbytes / 2**20:.0f} MiB like array)")
+
+    # Incremental refresh after a burst of new likes
+    recommender = Recommender(None, k=args.k, max_user_likes=args.max_user_likes)
+    recommender.index, recommender._likes = index, likes
+    rng = np.random.default_rng(1)
+    for user_id, track_id in zip(rng.integers(1, args.users + 1, args.refresh_likes),
+                                 rng.integers(1, args.tracks + 1, args.refresh_likes)):
+        recommender.record_like(int(user_id), int(track_id))
+    started = time.perf_counter()
+    recommender.refresh()
+    print(f"incremental refresh of {args.refresh_likes} likes: {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--likes", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--tracks", type=int, default=100_000)
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--max-user-likes", type=int, default=500)
+    parser.add_argument("--refresh-likes", type=int, default=100)
+    main(parser.parse_args())
@@ -0,0 +1,149 @@
+"""Concurrent chat reads and writes on SQLite: default settings vs the tuned profile.
+
+Writer threads insert messages one transaction each, as the chat endpoints
+do. At the same time, reader threads page through conversation history.
+Each profile gets its own freshly seeded database file, because journal_mode
+persists in the file:
+
+    default  create_engine(url), rollback journal, synchronous=FULL
+    tuned    engine_options() + sqlite_pragmas() from app.database (WAL, NORMAL, mmap, busy_timeout)
+
+    python -m benchmarks.sqlite_concurrency --writers 4 --readers 16 --seconds 10
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+from benchmarks.common import configure, git_revision, summarize
+
+configure("sqlite_concurrency")
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, apply_sqlite_pragmas, engine_options, sqlite_pragmas
+from app.models import like, track  # noqa: F401  Registers the remaining tables
+from app.models.message import Message, conversation_key
+from app.models.user import User
+
+
+def make_engine(profile: str, path: str):
+    if os.path.exists(path):
+        os.remove(path)
+    url = f"sqlite:///{path}"
+    if profile == "default":
+        return create_engine(url)
+    engine = create_engine(url, **engine_options(url))
+    apply_sqlite_pragmas(engine, sqlite_pragmas())
+    return engine
+
+
+def seed(Session, users: int, messages: int):
+    with Session() as db:
+        db.add_all([User(email=f"user{i}@bench", password="x") for i in range(users)])
+        db.commit()
+        db.bulk_insert_mappings(Message, [
+            {
+                "sender_id": 1 + i % users,
+                "receiver_id": 1 + (i + 1) % users,
+                "conversation_key": conversation_key(1 + i % users, 1 + (i + 1) % users),
+                "content": f"message {i}",
+            }
+            for i in range(messages)
+        ])
+        db.commit()
+
+
+def run_profile(profile: str, args) -> dict:
+    engine = make_engine(profile, os.path.join(tempfile.gettempdir(), f"spotify_api_bench_sqlite_{profile}.db"))
+    Session = sessionmaker(bind=engine, autoflush=False)
+    Base.metadata.create_all(bind=engine)
+    seed(Session, args.users, args.messages)
+
+    stop = threading.Event()
+    results = {"read": ([], []), "write": ([], [])}  # latencies, errors
+    lock = threading.Lock()
+
+    def record(kind: str, started: float, error: Exception = None):
+        with lock:
+            if error is None:
+                results[kind][0].append(time.perf_counter() - started)
+            else:
+                results[kind][1].append(str(error.orig) if isinstance(error, OperationalError) else repr(error))
+
+    def writer(index: int):
+        i = 0
+        while not stop.is_set():
+            sender, receiver = 1 + (index + i) % args.users, 1 + (index + i + 1) % args.users
+            started = time.perf_counter()
+            try:
+                with Session() as db:
+                    db.add(Message(sender_id=sender, receiver_id=receiver, content=f"w{index}-{i}"))
+                    db.commit()
+            except OperationalError as e:
+                record("write", started, e)
+            else:
+                record("write", started)
+            i += 1
+
+    def reader(index: int):
+        i = 0
+        while not stop.is_set():
+            a = 1 + (index + i) % args.users
+            query = (
+                select(Message).where(Message.conversation_key == conversation_key(a, 1 + a % args.users))
+                .order_by(Message.id.desc()).limit(50)
+            )
+            started = time.perf_counter()
+            try:
+                with Session() as db:
+                    db.execute(query).scalars().all()
+            except OperationalError as e:
+                record("read", started, e)
+            else:
+                record("read", started)
+            i += 1
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+
+    report = {}
+    for kind, (latencies, errors) in results.items():
+        report[kind] = summarize(latencies, elapsed, len(errors))
+        if errors:
+            report[kind]["error_samples"] = sorted(set(errors))[:3]
+    return report
+
+
+def main(args):
+    report = {
+        "revision": git_revision(),
+        "config": vars(args),
+        "tuned_pragmas": sqlite_pragmas(),
+        "profiles": {profile: run_profile(profile, args) for profile in args.profiles},
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", nargs="+", choices=["default", "tuned"], default=["default", "tuned"])
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--messages", type=int, default=50000)
+    main(parser.parse_args())
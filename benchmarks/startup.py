@@ -0,0 +1,120 @@
+"""Measure cold start: importing app.main, then time until a worker serves and is ready.
+
+Each import is timed in a fresh interpreter (nothing cached in sys.modules),
+and `-X importtime` lists the modules that cost the most. The server phase
+starts uvicorn as a subprocess and polls /health (serving) and /ready
+(pools and caches warm).
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --max-import-seconds 1.5   # exit 1 if slower, for CI
+
+Pass --skip-server to only profile the import.
+"""
+import argparse
+import json
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.common import configure, git_revision
+
+DATABASE_URL = configure("startup")
+
+import httpx
+
+IMPORT_APP = "import app.main"
+
+
+def time_imports(repeat: int) -> list:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", IMPORT_APP], check=True)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def slowest_imports(count: int) -> list:
+    """Top modules by self time from one `python -X importtime` run."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_APP], check=True, capture_output=True, text=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append({"module": module.strip(), "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    return sorted(rows, key=lambda row: row["self_ms"], reverse=True)[:count]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_server(timeout: float) -> dict:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"
+    ])
+    result = {"serving_s": None, "ready_s": None, "ready": None}
+    try:
+        with httpx.Client(base_url=base_url, timeout=1) as client:
+            while time.perf_counter() - started < timeout and server.poll() is None:
+                try:
+                    if result["serving_s"] is None and client.get("/health").status_code == 200:
+                        result["serving_s"] = round(time.perf_counter() - started, 3)
+                    response = client.get("/ready")
+                    if response.status_code == 200:
+                        result["ready_s"] = round(time.perf_counter() - started, 3)
+                        result["ready"] = response.json()
+                        break
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.02)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    return result
+
+
+def main(args) -> int:
+    subprocess.run([sys.executable, "-m", "app.init_db"], check=True, stdout=subprocess.DEVNULL)
+    time_imports(1)  # Populate __pycache__ so the runs below measure imports, not compilation
+
+    timings = time_imports(args.repeat)
+    report = {
+        "revision": git_revision(),
+        "database_url": DATABASE_URL,
+        "import_s": {
+            "median": round(statistics.median(timings), 3),
+            "min": round(min(timings), 3),
+            "max": round(max(timings), 3),
+        },
+        "slowest_imports": slowest_imports(args.top),
+    }
+    if not args.skip_server:
+        report["server"] = time_server(args.timeout)
+    print(json.dumps(report, indent=2))
+
+    if args.max_import_seconds is not None and report["import_s"]["median"] > args.max_import_seconds:
+        print(f"import app.main took {report['import_s']['median']}s, over the {args.max_import_seconds}s budget",
+              file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="How many of the slowest imports to list")
+    parser.add_argument("--max-import-seconds", type=float, help="Fail if the median import is slower")
+    parser.add_argument("--skip-server", action="store_true")
+    parser.add_argument("--timeout", type=float, default=60)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import time
+
+# Settings are read when app.core.config is first imported, so set them up front
+_db_dir = tempfile.mkdtemp(prefix="spotify_api_tests_")
+os.environ.update({
+    "APP_NAME": "spotify-api-tests",
+    "SECRET_KEY": "test-secret",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+    "DATABASE_URL": f"sqlite:///{os.path.join(_db_dir, 'test.db')}",
+    "WARMUP_PASSWORD_HASHER": "false",
+})
+os.environ.pop("READ_DATABASE_URL", None)
+# StaticFiles refuses to start without its directory; uploads normally create it
+os.makedirs("app/static/music_files", exist_ok=True)
+
+import pytest
+from fastapi.testclient import TestClient
+from uuid import uuid4
+from app.database import SessionLocal
+from app.init_db import create_schema
+from app.main import app
+from app.models.user import User
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    create_schema()
+
+
+@pytest.fixture(scope="session")
+def client(schema):
+    # One lifespan for the whole run: readiness is process-wide and stays "stopping" after shutdown
+    with TestClient(app) as client:
+        # Let the background warmup finish so its queries do not land in a test's measurements
+        deadline = time.monotonic() + 10
+        while client.get("/ready").status_code != 200:
+            assert time.monotonic() < deadline, client.get("/ready").json()
+            time.sleep(0.05)
+        yield client
+
+
+@pytest.fixture
+def db():
+    with SessionLocal() as session:
+        yield session
+
+
+@pytest.fixture
+def make_user():
+    def make_user() -> User:
+        # Own session, closed straight away, so no pooled connection outlives the call
+        with SessionLocal(expire_on_commit=False) as session:
+            user = User(email=f"{uuid4().hex}@example.com", password="x")
+            session.add(user)
+            session.commit()
+        return user
+    return make_user
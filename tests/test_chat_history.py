@@ -0,0 +1,118 @@
+import base64
+from contextlib import contextmanager
+from sqlalchemy import event
+from app.database import async_engine, engine
+from app.models.message import Message, MessageReaction, conversation_key
+
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    targets = [engine, async_engine.sync_engine]
+    for target in targets:
+        event.listen(target, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        for target in targets:
+            event.remove(target, "before_cursor_execute", record)
+
+
+def seed_conversation(db, alice, bob, count: int):
+    for i in range(count):
+        sender, receiver = (alice, bob) if i % 2 == 0 else (bob, alice)
+        message = Message(sender_id=sender.id, receiver_id=receiver.id, content=f"message {i}")
+        db.add(message)
+        db.flush()
+        db.add(MessageReaction(message_id=message.id, user_id=alice.id, emoji="👍"))
+        if i % 3 == 0:
+            db.add(MessageReaction(message_id=message.id, user_id=bob.id, emoji="🔥"))
+    db.commit()
+
+
+def test_history_query_count_does_not_grow_with_page_size(client, db, make_user):
+    alice, bob = make_user(), make_user()
+    seed_conversation(db, alice, bob, 120)
+    params = {"user_id": alice.id, "other_user_id": bob.id}
+    # First read advances alice's watermark; measure steady-state pages after it
+    assert client.get("/chat/history/", params=params).status_code == 200
+
+    counts = {}
+    for limit in (5, 50, 100):
+        with count_statements() as statements:
+            response = client.get("/chat/history/", params={**params, "limit": limit})
+        assert response.status_code == 200, response.text
+        page = response.json()
+        assert len(page) == limit
+        assert all(message["reactions"].get("👍") == 1 for message in page)
+        counts[limit] = len(statements)
+
+    assert len(set(counts.values())) == 1, counts
+
+
+def test_history_rejects_out_of_range_limit(client, make_user):
+    alice, bob = make_user(), make_user()
+    params = {"user_id": alice.id, "other_user_id": bob.id, "before_id": 10}
+    assert client.get("/chat/history/", params={**params, "limit": 0}).status_code == 422
+    assert client.get("/chat/history/", params={**params, "limit": 101}).status_code == 422
+
+
+def add_message(db, sender, receiver, content: str) -> int:
+    message = Message(sender_id=sender.id, receiver_id=receiver.id, content=content)
+    db.add(message)
+    db.commit()
+    return message.id
+
+
+def conversation_ids(db, alice, bob) -> list:
+    key = conversation_key(alice.id, bob.id)
+    return [message_id for (message_id,) in
+            db.query(Message.id).filter(Message.conversation_key == key).order_by(Message.id)]
+
+
+def test_history_cursor_pages_without_duplicates_or_gaps(client, db, make_user):
+    alice, bob = make_user(), make_user()
+    seed_conversation(db, alice, bob, 25)
+    existing = conversation_ids(db, alice, bob)
+    params = {"user_id": alice.id, "other_user_id": bob.id, "limit": 10}
+
+    # Backwards from the newest message; messages sent meanwhile must not shift the pages
+    seen = []
+    response = client.get("/chat/history/", params={**params, "before_id": existing[-1] + 1})
+    while True:
+        assert response.status_code == 200, response.text
+        seen = [message["id"] for message in response.json()] + seen
+        add_message(db, bob, alice, "sent while paging back")
+        if "X-Next-Cursor" not in response.headers:
+            break
+        response = client.get("/chat/history/", params={**params, "cursor": response.headers["X-Next-Cursor"]})
+    assert seen == existing
+
+    # Forwards from the newest message we had, picking up what arrives between requests
+    newer = conversation_ids(db, alice, bob)[len(existing):]
+    seen = []
+    cursor = base64.urlsafe_b64encode(f"after:{existing[-1]}".encode()).decode()
+    for i in range(30):
+        response = client.get("/chat/history/", params={**params, "cursor": cursor})
+        assert response.status_code == 200, response.text
+        page = [message["id"] for message in response.json()]
+        assert page == sorted(page)
+        seen += page
+        if not page:
+            break
+        cursor = response.headers["X-Next-Cursor"]
+        if i < 3:
+            newer.append(add_message(db, alice, bob, f"sent while paging forward {i}"))
+    assert seen == newer
+
+
+def test_inbox_rejects_forward_cursor(client, make_user):
+    alice = make_user()
+    for direction, status in (("before", 200), ("after", 400)):
+        cursor = base64.urlsafe_b64encode(f"{direction}:10".encode()).decode()
+        response = client.get("/chat/inbox", params={"user_id": alice.id, "cursor": cursor})
+        assert response.status_code == status, response.text
@@ -0,0 +1,43 @@
+import time
+import pytest
+from starlette.websockets import WebSocketDisconnect
+from app.core.manager_instance import manager, presence
+
+
+def wait_for(condition, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_closing_a_replaced_socket_keeps_the_reconnected_one(client, make_user, monkeypatch):
+    user, friend = make_user(), make_user()
+    old = client.websocket_connect(f"/chat/ws/{user.id}").__enter__()
+    replaced = manager.active_connections[user.id]
+    removed = []
+    remove = manager.remove
+
+    def record_remove(connection):
+        remove(connection)
+        removed.append(connection)
+
+    monkeypatch.setattr(manager, "remove", record_remove)
+
+    with client.websocket_connect(f"/chat/ws/{user.id}") as new:
+        new.send_json({"type": "subscribe_presence", "user_ids": [friend.id]})
+        assert new.receive_json()["type"] == "presence"
+        current = manager.active_connections[user.id]
+
+        # The replaced socket is closed so its handler stops acting as this user
+        with pytest.raises(WebSocketDisconnect) as closed:
+            old.receive_json()
+        assert closed.value.code == 1008
+        old.__exit__(None, None, None)
+        wait_for(lambda: replaced in removed)  # The old handler has run its cleanup
+
+        assert manager.active_connections.get(user.id) is current
+        assert friend.id in presence.subscriptions.get(user.id, set())
+
+    wait_for(lambda: user.id not in manager.active_connections)
+    wait_for(lambda: user.id not in presence.subscriptions)
@@ -0,0 +1,39 @@
+import asyncio
+from app.core.manager_instance import manager
+from app.core.recommender import _like_key, recommender
+from app.core.security import create_access_token
+from app.models.track import Track
+
+
+def test_like_events_are_published_for_other_workers(client, db, make_user, monkeypatch):
+    user = make_user()
+    tracks = [Track(title=f"Published {i}", artist="Someone") for i in range(2)]
+    db.add_all(tracks)
+    db.commit()
+    track_ids = [track.id for track in tracks]
+
+    published = []
+
+    async def publish(message):
+        published.append(message)
+
+    monkeypatch.setattr(manager, "publish", publish)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id), 'email': user.email})}"}
+    body = {"user_id": user.id, "track_ids": track_ids}
+
+    assert client.post("/likes/batch_like", json=body, headers=headers).status_code == 200
+    assert client.post("/likes/batch_unlike", json={**body, "track_ids": track_ids[:1]}, headers=headers).status_code == 200
+    assert published == [
+        {"type": "like_events", "user_id": user.id, "liked": track_ids, "unliked": []},
+        {"type": "like_events", "user_id": user.id, "liked": [], "unliked": track_ids[:1]},
+    ]
+
+
+def test_like_events_from_another_worker_reach_the_recommender(monkeypatch):
+    monkeypatch.setattr(recommender, "_added", set())
+    monkeypatch.setattr(recommender, "_removed", set())
+    asyncio.run(manager._on_backend_message(
+        {"type": "like_events", "origin": "another-worker", "user_id": 7, "liked": [11, 12], "unliked": [13]}
+    ))
+    assert {_like_key(7, 11), _like_key(7, 12)} <= recommender._added
+    assert _like_key(7, 13) in recommender._removed
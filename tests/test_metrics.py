@@ -0,0 +1,25 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app.core import metrics
+from app.database import engine
+
+
+def test_failed_statements_are_counted_and_leave_no_timer_behind(client):
+    before = metrics.db_queries._values.get((), 0)
+    with engine.connect() as connection:
+        with pytest.raises(OperationalError):
+            connection.execute(text("SELECT * FROM no_such_table"))
+        assert connection.info.get("query_started") == []
+        connection.execute(text("SELECT 1"))
+    assert metrics.db_queries._values.get((), 0) == before + 2
+
+
+def test_running_totals_are_exposed_as_counters(client):
+    body = client.get("/metrics").text
+    for name in (
+        "catalog_cache_lookups_total", "token_cache_lookups_total", "password_hash_rejected_total",
+        "websocket_dropped_frames_total", "websocket_slow_consumer_disconnects_total",
+    ):
+        assert f"# TYPE {name} counter" in body
+    assert "# TYPE websocket_connections gauge" in body
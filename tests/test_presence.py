@@ -0,0 +1,42 @@
+import pytest
+from app.core.presence import PresenceTracker
+from app.core.websocket_manager import ConnectionManager
+
+
+@pytest.fixture
+def presence():
+    return PresenceTracker(ConnectionManager(), max_ids_per_frame=3, max_subscriptions=4)
+
+
+def test_numeric_string_ids_are_coerced(presence):
+    assert presence.subscribe(1, ["5", 6]) == {"type": "presence", "online": [], "offline": [5, 6]}
+    assert presence.subscriptions[1] == {5, 6}
+    presence.unsubscribe(1, ["5"])
+    assert presence.subscriptions[1] == {6}
+
+
+@pytest.mark.parametrize("user_ids", [["abc"], [None], [1.5], [True], "5", {"id": 5}])
+def test_invalid_ids_are_rejected(presence, user_ids):
+    with pytest.raises(ValueError):
+        presence.subscribe(1, user_ids)
+    assert presence.subscriptions == {} and presence.watchers == {}
+
+
+def test_ids_per_frame_and_subscriptions_are_capped(presence):
+    with pytest.raises(ValueError):
+        presence.subscribe(1, [2, 3, 4, 5])
+    presence.subscribe(1, [2, 3, 4])
+    presence.subscribe(1, [2, 5])  # 2 is already watched, 5 is the fourth
+    with pytest.raises(ValueError):
+        presence.subscribe(1, [6])
+    assert presence.subscriptions[1] == {2, 3, 4, 5}
+
+    presence.unsubscribe_all(1)
+    assert presence.subscriptions == {} and presence.watchers == {}
+
+
+def test_invalid_subscription_gets_an_error_frame(client, make_user):
+    user = make_user()
+    with client.websocket_connect(f"/chat/ws/{user.id}") as socket:
+        socket.send_json({"type": "subscribe_presence", "user_ids": ["not-a-user"]})
+        assert socket.receive_text().startswith("Error: Invalid user id")
@@ -0,0 +1,49 @@
+import asyncio
+import os
+import tempfile
+import time
+from app.core.pubsub import UnixSocketPubSub
+
+
+async def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        await asyncio.sleep(0.01)
+
+
+async def stalled_peer_scenario(path: str):
+    received = []
+
+    async def ignore(message):
+        pass
+
+    async def record(message):
+        if message.get("type") == "bulk":
+            received.append(message["i"])
+
+    broker = UnixSocketPubSub(path, peer_queue_size=8)
+    await broker.start(ignore)  # First to start: runs the broker
+    fast = UnixSocketPubSub(path)
+    await fast.start(record)
+    # A worker that stopped reading: its socket buffer fills up and stays full
+    _, stalled = await asyncio.open_unix_connection(path)
+    await wait_for(lambda: len(broker._peers) == 3)
+
+    payload = "x" * 16384  # Under the StreamReader line limit
+    try:
+        # The healthy worker keeps up with every message while the stalled one falls behind
+        for i in range(200):
+            await broker.publish({"type": "bulk", "i": i, "payload": payload})
+            await wait_for(lambda: len(received) == i + 1)
+        assert received == list(range(200))
+        await wait_for(lambda: len(broker._peers) == 2)  # The stalled worker was cut off
+    finally:
+        stalled.close()
+        await fast.stop()
+        await broker.stop()
+
+
+def test_stalled_peer_does_not_block_the_others():
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(stalled_peer_scenario(os.path.join(directory, "broker.sock")))
@@ -0,0 +1,19 @@
+from sqlalchemy import text
+from app.database import engine
+from app.init_db import create_schema
+from app.models.track import Track
+
+
+def test_missing_triggers_are_restored_and_index_rebuilt(client, db):
+    with engine.begin() as connection:
+        connection.execute(text("DROP TRIGGER tracks_fts_ai"))
+    db.add(Track(title="Zyxwv Lullaby", artist="Nobody"))
+    db.commit()
+    assert client.get("/tracks/search", params={"q": "zyxwv"}).json() == []
+
+    create_schema()
+    assert [track["title"] for track in client.get("/tracks/search", params={"q": "zyxwv"}).json()] == ["Zyxwv Lullaby"]
+
+    db.add(Track(title="Zyxwv Reprise", artist="Nobody"))
+    db.commit()
+    assert len(client.get("/tracks/search", params={"q": "zyxwv"}).json()) == 2
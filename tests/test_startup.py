@@ -0,0 +1,43 @@
+import json
+import subprocess
+import sys
+
+# Cold import of app.main; well above the ~1.3 s it takes today, so only a real regression trips it
+IMPORT_BUDGET_SECONDS = 4.0
+
+# Runs in a fresh interpreter so nothing is already in sys.modules
+IMPORT_APP = """
+import json, time
+from sqlalchemy import MetaData, event
+from sqlalchemy.pool import Pool
+
+events = []
+event.listen(Pool, "connect", lambda *args: events.append("connect"))
+create_all = MetaData.create_all
+MetaData.create_all = lambda self, *args, **kw: events.append("create_all") or create_all(self, *args, **kw)
+
+started = time.perf_counter()
+import app.main
+print(json.dumps({"seconds": time.perf_counter() - started, "events": events}))
+"""
+
+
+def slowest_imports(stderr: str, count: int = 10) -> list:
+    rows = []
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "self [us]" not in line:
+            self_us, _, module = line[len("import time:"):].split("|")
+            rows.append((int(self_us) / 1000, module.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def test_import_is_fast_and_touches_no_database():
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_APP], capture_output=True, text=True, check=True
+    )
+    report = json.loads(result.stdout.splitlines()[-1])
+
+    assert report["events"] == [], "importing app.main must not connect to the database or create tables"
+    assert report["seconds"] < IMPORT_BUDGET_SECONDS, (
+        f"import app.main took {report['seconds']:.2f}s; slowest modules (ms): {slowest_imports(result.stderr)}"
+    )
@@ -0,0 +1,53 @@
+from contextlib import ExitStack
+from app.core.config import settings
+from app.core.manager_instance import manager
+from app.database import async_engine, engine
+from app.models.message import Message, MessageReaction
+
+IDLE_SOCKETS = 1000
+FIRST_SOCKET_USER = 1_000_000
+
+
+def receive_until(socket, *frame_types):
+    """Read frames until one of each type has arrived; the socket handled everything sent before."""
+    waiting = set(frame_types)
+    while waiting:
+        frame = socket.receive_json()
+        if isinstance(frame, dict):
+            waiting.discard(frame.get("type"))
+
+
+def test_idle_sockets_hold_no_pooled_connections(client, db, make_user):
+    # A request-scoped session per socket would need a connection per socket; the pools are far smaller
+    assert settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW < IDLE_SOCKETS
+    assert engine.pool.size() < IDLE_SOCKETS
+    assert async_engine.pool.size() < IDLE_SOCKETS
+
+    receiver, watched = make_user(), make_user()
+    message = Message(sender_id=receiver.id, receiver_id=watched.id, content="react to me")
+    db.add(message)
+    db.flush()
+    db.add_all([
+        MessageReaction(message_id=message.id, user_id=FIRST_SOCKET_USER + i, emoji="👍")
+        for i in range(IDLE_SOCKETS)
+    ])
+    db.commit()
+    message_id = message.id
+    db.close()
+
+    with ExitStack() as stack:
+        sockets = []
+        for i in range(IDLE_SOCKETS):
+            socket = stack.enter_context(client.websocket_connect(f"/chat/ws/{FIRST_SOCKET_USER + i}"))
+            # A stored message, then a reaction that already exists: that path reads without committing
+            socket.send_json({"type": "chat_message", "receiver_id": receiver.id, "message": f"hello {i}"})
+            socket.send_json({"type": "add_reaction", "message_id": message_id, "emoji": "👍"})
+            socket.send_json({"type": "subscribe_presence", "user_ids": [watched.id]})
+            sockets.append(socket)
+        # Every socket has now used the database once and sits idle
+        for socket in sockets:
+            receive_until(socket, "message_ids", "presence")
+
+        assert len(manager.active_connections) >= IDLE_SOCKETS
+        assert engine.pool.checkedout() == 0
+        assert async_engine.pool.checkedout() == 0